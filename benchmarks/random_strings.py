@@ -0,0 +1,56 @@
+"""
+Compare `generate_random_string` with the implementation it replaced, which
+called the OS random generator once per character.
+
+    python -m benchmarks.random_strings
+"""
+import string
+import timeit
+import secrets
+from jommerce.auth.utils import generate_random_string, get_generator
+
+
+def legacy_generate_random_string(
+    length=6, lowercase=True, uppercase=True, digit=True, symbol=True
+):
+    values = set()
+    characters = ""
+    if lowercase:
+        values.add(secrets.choice(string.ascii_lowercase))
+        characters += string.ascii_lowercase
+    if uppercase:
+        values.add(secrets.choice(string.ascii_uppercase))
+        characters += string.ascii_uppercase
+    if digit:
+        values.add(secrets.choice(string.digits))
+        characters += string.digits
+    if symbol:
+        values.add(secrets.choice(string.punctuation))
+        characters += string.punctuation
+    indexes = secrets.SystemRandom().sample(range(length), len(values))
+    s = [secrets.choice(characters) for _ in range(length)]
+    for index, value in zip(indexes, values):
+        s[index] = value
+    return "".join(s)
+
+
+def main(number=20_000):
+    alphabet = string.ascii_letters + string.digits
+    cases = {
+        "legacy, 32 chars": lambda: legacy_generate_random_string(32, symbol=False),
+        "generate_random_string, 32 chars": lambda: generate_random_string(
+            32, symbol=False
+        ),
+        "generate_many, 32 chars": lambda: get_generator(alphabet).generate_many(
+            100, 32
+        ),
+    }
+    for name, function in cases.items():
+        # generate_many returns 100 strings per call.
+        calls = number // 100 if "many" in name else number
+        elapsed = timeit.timeit(function, number=calls)
+        print(f"{name}: {number / elapsed:,.0f} strings/s")
+
+
+if __name__ == "__main__":
+    main()
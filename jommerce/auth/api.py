@@ -0,0 +1,109 @@
+import json
+import math
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse, JsonResponse, HttpResponseNotAllowed
+from django.middleware.csrf import get_token
+from .conf import settings
+from .forms import SignupForm
+from .hashers import HasherOverloaded, get_hashers
+from .models import User
+from .throttling import athrottle
+from .views import get_user
+
+
+def serialize_user(user):
+    return {"id": user.pk, "email": user.email, "status": user.status}
+
+
+def error(status, code, retry_after=None, **data):
+    response = JsonResponse({"error": code, **data}, status=status)
+    if retry_after is not None:
+        response["Retry-After"] = str(max(1, math.ceil(retry_after)))
+    return response
+
+
+def overloaded():
+    return error(
+        503, "overloaded", retry_after=settings.AUTH_PASSWORD_HASHER_QUEUE_TIMEOUT or 1
+    )
+
+
+def parse_body(request):
+    """Return the JSON object of the request body, or None if it isn't one."""
+    try:
+        data = json.loads(request.body)
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+async def login(request):
+    if request.method != "POST":
+        return HttpResponseNotAllowed(["POST"])
+    data = parse_body(request)
+    if data is None or not all(
+        isinstance(data.get(field), str) for field in ("email", "password")
+    ):
+        return error(400, "invalid_request")
+    wait = await athrottle("login", request, data["email"])
+    if wait:
+        return error(429, "throttled", retry_after=wait)
+    try:
+        user = await User.objects.aget(email=data["email"])
+    except User.DoesNotExist:
+        user = None
+    try:
+        if user is None:
+            # Hash anyway, so the response time doesn't tell which emails exist.
+            await get_hashers()[0].ahash(data["password"])
+            verified = False
+        else:
+            verified = await user.averify_password(data["password"])
+    except HasherOverloaded:
+        return overloaded()
+    if not verified:
+        # Don't tell which of the email or the password is wrong.
+        return error(401, "invalid_credentials")
+    await request.session.acycle_key()
+    request.session.user = user
+    return JsonResponse({"user": serialize_user(user)})
+
+
+def logout(request):
+    if request.method != "POST":
+        return HttpResponseNotAllowed(["POST"])
+    request.session.user = None
+    return HttpResponse(status=204)
+
+
+async def signup(request):
+    if request.method != "POST":
+        return HttpResponseNotAllowed(["POST"])
+    data = parse_body(request)
+    if data is None:
+        return error(400, "invalid_request")
+    wait = await athrottle("signup", request, str(data.get("email", "")))
+    if wait:
+        return error(429, "throttled", retry_after=wait)
+    form = SignupForm(data)
+    # Validating a ModelForm queries the database.
+    if not await sync_to_async(form.is_valid)():
+        return error(400, "invalid_fields", fields=form.errors.get_json_data())
+    user = form.instance
+    try:
+        await user.asave(force_insert=True)
+    except HasherOverloaded:
+        return overloaded()
+    return JsonResponse({"user": serialize_user(user)}, status=201)
+
+
+async def me(request):
+    if request.method != "GET":
+        return HttpResponseNotAllowed(["GET"])
+    # Sets the CSRF cookie, like @ensure_csrf_cookie which doesn't support
+    # async views before Django 5.0, so clients can call the POST endpoints.
+    get_token(request)
+    user = await get_user(request)
+    if user is None or not user.is_authenticated:
+        return error(401, "not_authenticated")
+    return JsonResponse({"user": serialize_user(user)})
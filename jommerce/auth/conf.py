@@ -1,13 +1,82 @@
+import dataclasses
+import functools
 from django.conf import settings as django_settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
 from jommerce.auth import settings as app_settings
 
 
+@dataclasses.dataclass(frozen=True)
+class SessionCookieSettings:
+    name: str
+    domain: str
+    path: str
+    secure: bool
+    httponly: bool
+    samesite: str
+
+
 class Settings:
-    def __getattribute__(self, item):
+    """
+    Read settings from the Django settings, falling back to the defaults of
+    jommerce.auth.settings. A resolved value is stored on the instance, so
+    later reads are plain attribute lookups, until a setting changes.
+    """
+
+    def __getattr__(self, item):
         try:
-            return getattr(django_settings, item)
+            value = getattr(django_settings, item)
         except AttributeError:
-            return getattr(app_settings, item)
+            value = getattr(app_settings, item)
+        self.__dict__[item] = value
+        return value
+
+    @functools.cached_property
+    def session_cookie(self):
+        """A frozen snapshot of the AUTH_SESSION_COOKIE_* settings."""
+        return SessionCookieSettings(
+            name=self.AUTH_SESSION_COOKIE_NAME,
+            domain=self.AUTH_SESSION_COOKIE_DOMAIN,
+            path=self.AUTH_SESSION_COOKIE_PATH,
+            secure=self.AUTH_SESSION_COOKIE_SECURE,
+            httponly=self.AUTH_SESSION_COOKIE_HTTPONLY,
+            samesite=self.AUTH_SESSION_COOKIE_SAMESITE,
+        )
+
+    def clear(self):
+        self.__dict__.clear()
 
 
 settings = Settings()
+
+
+@receiver(setting_changed)
+def clear_settings(*, setting, **kwargs):
+    """
+    Forget the resolved settings and the objects built from them when a
+    setting changes, e.g. with override_settings() in tests.
+    """
+    settings.clear()
+    # Imported here, the modules import these settings.
+    from jommerce.auth import hashers, middleware, stores, throttling, validators
+
+    if setting == "AUTH_PASSWORD_HASHERS":
+        hashers.get_hashers.cache_clear()
+        hashers.get_hashers_by_algorithm.cache_clear()
+    elif setting in (
+        "AUTH_PASSWORD_HASHER_MEMORY_BUDGET",
+        "AUTH_PASSWORD_HASHER_QUEUE_TIMEOUT",
+    ):
+        hashers.get_limiter.cache_clear()
+    elif setting == "AUTH_PASSWORD_HASHER_MAX_WORKERS":
+        if hashers.get_executor.cache_info().currsize:
+            hashers.get_executor().shutdown()
+        hashers.get_executor.cache_clear()
+    elif setting == "AUTH_SESSION_STORE":
+        stores.get_session_store.cache_clear()
+    elif setting in ("AUTH_THROTTLE_RATES", "AUTH_THROTTLE_CACHE"):
+        throttling.get_buckets.cache_clear()
+    elif setting == "AUTH_PASSWORD_VALIDATORS":
+        validators.get_password_policy.cache_clear()
+    elif setting in ("AUTH_SESSION_EXEMPT_PATHS", "ROOT_URLCONF"):
+        middleware.is_sessionless.cache_clear()
@@ -0,0 +1,7 @@
+def sessionless(view_func):
+    """
+    Mark a view as not using the session, so AuthenticationMiddleware doesn't
+    look it up nor write the session cookie. request.user is always anonymous.
+    """
+    view_func.sessionless = True
+    return view_func
@@ -0,0 +1,58 @@
+import json
+import zlib
+import base64
+from django.db import models
+from .conf import settings
+
+JSON = b"j"
+ZLIB_JSON = b"z"
+
+
+def encode(data):
+    """
+    Serialize `data` to compact JSON, compressed with zlib when it is at least
+    AUTH_SESSION_DATA_COMPRESS_MIN_LENGTH bytes long.
+    """
+    value = json.dumps(data, separators=(",", ":"), ensure_ascii=False).encode()
+    min_length = settings.AUTH_SESSION_DATA_COMPRESS_MIN_LENGTH
+    if min_length is not None and len(value) >= min_length:
+        compressed = zlib.compress(value)
+        if len(compressed) < len(value):
+            return ZLIB_JSON + compressed
+    return JSON + value
+
+
+def decode(value):
+    value = bytes(value)
+    codec, value = value[:1], value[1:]
+    if codec == ZLIB_JSON:
+        value = zlib.decompress(value)
+    elif codec != JSON:
+        raise ValueError(f"Unknown session data codec: {codec!r}")
+    return json.loads(value)
+
+
+class SessionDataField(models.BinaryField):
+    """
+    Store a dictionary in a binary column using `encode` and `decode`.
+    """
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return value
+        return decode(value)
+
+    def to_python(self, value):
+        if isinstance(value, str):
+            value = base64.b64decode(value.encode("ascii"))
+        if isinstance(value, (bytes, memoryview)):
+            return decode(value)
+        return value
+
+    def get_db_prep_value(self, value, connection, prepared=False):
+        if value is not None and not isinstance(value, (bytes, memoryview)):
+            value = encode(value)
+        return super().get_db_prep_value(value, connection, prepared)
+
+    def value_to_string(self, obj):
+        return base64.b64encode(encode(self.value_from_object(obj))).decode("ascii")
@@ -1,9 +1,15 @@
+import os
+import time
+import asyncio
 import base64
 import hashlib
 import secrets
 import binascii
 import functools
+import threading
+import contextlib
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
 from .conf import settings
 from django.utils.module_loading import import_string
 from .utils import generate_random_string
@@ -26,17 +32,208 @@ def get_hashers():
     ]
 
 
+@functools.lru_cache
+def get_hashers_by_algorithm():
+    hashers = {}
+    for hasher in get_hashers():
+        hashers.setdefault(hasher.algorithm, hasher)
+    return hashers
+
+
+def identify_hasher(hashed_password):
+    """
+    Return the configured hasher of the algorithm that `hashed_password` was
+    hashed with, or None.
+    """
+    algorithm = hashed_password.split(BasePasswordHasher.separator, 1)[0]
+    return get_hashers_by_algorithm().get(algorithm)
+
+
+def check_password(raw_password, hashed_password):
+    """
+    Return a (verified, need_rehash) tuple. Only the hasher identified by the
+    prefix of `hashed_password` is run. Legacy hashes without a prefix are
+    tried with every hasher, and must be rehashed once verified.
+    """
+    hashers = get_hashers()
+    if BasePasswordHasher.separator not in hashed_password:
+        verified = any(
+            hasher.verify_legacy(raw_password, hashed_password) for hasher in hashers
+        )
+        return verified, verified
+    hasher = identify_hasher(hashed_password)
+    if hasher is None or not hasher.verify(raw_password, hashed_password):
+        return False, False
+    return True, hasher is not hashers[0] or hasher.needs_rehash(hashed_password)
+
+
+async def acheck_password(raw_password, hashed_password):
+    return await asyncio.get_running_loop().run_in_executor(
+        get_executor(), check_password, raw_password, hashed_password
+    )
+
+
+@functools.lru_cache
+def get_executor():
+    """
+    Return the thread pool that runs `ahash` and `averify`. hashlib, argon2 and
+    bcrypt release the GIL while hashing, so the hashes run in parallel.
+    """
+    return ThreadPoolExecutor(
+        max_workers=settings.AUTH_PASSWORD_HASHER_MAX_WORKERS or os.cpu_count(),
+        thread_name_prefix="jommerce.auth.hashers",
+    )
+
+
+class HasherOverloaded(Exception):
+    """Raised when a hash waits too long for memory to be available."""
+
+
+class MemoryLimiter:
+    """
+    A process-wide semaphore weighted by memory: a hash waits until the memory
+    it uses fits in `budget` bytes (None for no limit), and raises
+    HasherOverloaded after `timeout` seconds.
+    """
+
+    def __init__(self, budget=None, timeout=None):
+        self.budget = budget
+        self.timeout = timeout
+        self.in_use = 0
+        self.queue_depth = 0
+        self.max_queue_depth = 0
+        self.acquired = 0
+        self.timeouts = 0
+        self.wait_time = 0.0
+        self.max_wait_time = 0.0
+        self._condition = threading.Condition()
+
+    def get_weight(self, memory):
+        # A hash that needs more than the whole budget runs alone.
+        return memory if self.budget is None else min(memory, self.budget)
+
+    def acquire(self, memory):
+        weight = self.get_weight(memory)
+        start = time.monotonic()
+        with self._condition:
+            self.queue_depth += 1
+            self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+            try:
+                acquired = self._condition.wait_for(
+                    lambda: self.budget is None or self.in_use + weight <= self.budget,
+                    self.timeout,
+                )
+            finally:
+                self.queue_depth -= 1
+            wait_time = time.monotonic() - start
+            self.wait_time += wait_time
+            self.max_wait_time = max(self.max_wait_time, wait_time)
+            if not acquired:
+                self.timeouts += 1
+                raise HasherOverloaded(
+                    f"No memory available for hashing after {self.timeout} seconds."
+                )
+            self.in_use += weight
+            self.acquired += 1
+
+    def release(self, memory):
+        with self._condition:
+            self.in_use -= self.get_weight(memory)
+            self._condition.notify_all()
+
+    @contextlib.contextmanager
+    def limit(self, memory):
+        self.acquire(memory)
+        try:
+            yield
+        finally:
+            self.release(memory)
+
+    def get_metrics(self):
+        with self._condition:
+            return {
+                "budget": self.budget,
+                "in_use": self.in_use,
+                "queue_depth": self.queue_depth,
+                "max_queue_depth": self.max_queue_depth,
+                "acquired": self.acquired,
+                "timeouts": self.timeouts,
+                "wait_time": self.wait_time,
+                "max_wait_time": self.max_wait_time,
+            }
+
+
+@functools.lru_cache
+def get_limiter():
+    return MemoryLimiter(
+        budget=settings.AUTH_PASSWORD_HASHER_MEMORY_BUDGET,
+        timeout=settings.AUTH_PASSWORD_HASHER_QUEUE_TIMEOUT,
+    )
+
+
 class BasePasswordHasher(ABC):
+    """
+    Hashed passwords are stored as "<algorithm>$<params>$<salt>$<hash>", where
+    params are the cost parameters the hash was computed with.
+    """
+
+    separator = "$"
     salt_length = 32
 
+    @property
     @abstractmethod
-    def hash(self, password, salt=None):
+    def algorithm(self):
         pass
 
+    @property
+    @abstractmethod
+    def params(self):
+        """The current cost parameters, as a string."""
+
+    @abstractmethod
+    def compute(self, password, salt, params):
+        """Return the hash of `password` computed with `salt` and `params`."""
+
+    def get_memory_usage(self, params):
+        """Return the number of bytes used by a hash computed with `params`."""
+        return 4 * 1024
+
+    def limit(self, params):
+        return get_limiter().limit(self.get_memory_usage(params))
+
+    def generate_salt(self):
+        return generate_random_string(self.salt_length, symbol=False)
+
+    def hash(self, password, salt=None):
+        salt = salt or self.generate_salt()
+        with self.limit(self.params):
+            hash_ = self.compute(password, salt, self.params)
+        return self.separator.join((self.algorithm, self.params, salt, hash_))
+
     def verify(self, raw_password, hashed_password):
+        algorithm, params, salt, hash_ = hashed_password.split(self.separator, 3)
+        with self.limit(params):
+            computed = self.compute(raw_password, salt, params)
+        return secrets.compare_digest(hash_.encode(), computed.encode())
+
+    def needs_rehash(self, hashed_password):
+        return hashed_password.split(self.separator, 2)[1] != self.params
+
+    def verify_legacy(self, raw_password, hashed_password):
+        """Verify a hash stored as "<salt><hash>" with the current params."""
         salt = hashed_password[: self.salt_length]
-        return secrets.compare_digest(
-            hashed_password.encode(), self.hash(raw_password, salt).encode()
+        with self.limit(self.params):
+            computed = salt + self.compute(raw_password, salt, self.params)
+        return secrets.compare_digest(hashed_password.encode(), computed.encode())
+
+    async def ahash(self, password, salt=None):
+        return await asyncio.get_running_loop().run_in_executor(
+            get_executor(), self.hash, password, salt
+        )
+
+    async def averify(self, raw_password, hashed_password):
+        return await asyncio.get_running_loop().run_in_executor(
+            get_executor(), self.verify, raw_password, hashed_password
         )
 
 
@@ -49,17 +246,26 @@ class PBKDF2PasswordHasher(BasePasswordHasher):
         self.digest_size = digest_size
         self.salt_length = salt_length
 
-    def hash(self, password, salt=None):
-        salt = salt or generate_random_string(self.salt_length, symbol=False)
+    @property
+    def algorithm(self):
+        return f"pbkdf2_{self.digest_name}"
+
+    @property
+    def params(self):
+        if self.digest_size is None:
+            return str(self.iterations)
+        return f"{self.iterations},{self.digest_size}"
+
+    def compute(self, password, salt, params):
+        iterations, _, digest_size = params.partition(",")
         hashed = hashlib.pbkdf2_hmac(
             self.digest_name,
             password.encode(),
             salt.encode(),
-            self.iterations,
-            dklen=self.digest_size,
+            int(iterations),
+            dklen=int(digest_size) if digest_size else None,
         )
-        hashed = base64.b64encode(hashed).decode("ascii").strip()
-        return salt + hashed
+        return base64.b64encode(hashed).decode("ascii").strip()
 
 
 class Argon2PasswordHasher(BasePasswordHasher):
@@ -94,23 +300,38 @@ class Argon2PasswordHasher(BasePasswordHasher):
                 "'type' must be one of these values. {'argon2id', 'argon2i', 'argon2d'}"
             )
 
-    def hash(self, password, salt=None):
-        salt = salt or generate_random_string(self.salt_length, symbol=False)
-        hashed = (
+    @property
+    def algorithm(self):
+        return self._type
+
+    @property
+    def params(self):
+        return (
+            f"{self.version},{self.memory_cost},{self.time_cost},"
+            f"{self.parallelism},{self.hash_length}"
+        )
+
+    def get_memory_usage(self, params):
+        return int(params.split(",")[1]) * 1024
+
+    def compute(self, password, salt, params):
+        version, memory_cost, time_cost, parallelism, hash_length = map(
+            int, params.split(",")
+        )
+        return (
             argon2.low_level.hash_secret(
                 password.encode(),
                 salt.encode(),
-                time_cost=self.time_cost,
-                memory_cost=self.memory_cost,
-                parallelism=self.parallelism,
-                hash_len=self.hash_length,
+                time_cost=time_cost,
+                memory_cost=memory_cost,
+                parallelism=parallelism,
+                hash_len=hash_length,
                 type=self.type,
-                version=self.version,
+                version=version,
             )
             .decode("ascii")
             .rsplit("$", 1)[1]
         )
-        return salt + hashed
 
 
 class BcryptPasswordHasher(BasePasswordHasher):
@@ -119,32 +340,47 @@ class BcryptPasswordHasher(BasePasswordHasher):
         self.rounds = "0" + str(rounds) if rounds < 10 else str(rounds)
         self.prefix = prefix
 
-    def hash(self, password, salt=None):
+    @property
+    def algorithm(self):
+        if self.digest is None:
+            return "bcrypt"
+        return f"bcrypt_{self.digest().name}"
+
+    @property
+    def params(self):
+        return f"{self.prefix.decode()},{self.rounds}"
+
+    def generate_salt(self):
+        return bcrypt.gensalt(int(self.rounds), self.prefix).decode("ascii")[-22:]
+
+    def digest_password(self, password):
         password = password.encode()
         if self.digest is not None:
             password = binascii.hexlify(self.digest(password).digest())
-        return (
-            bcrypt.hashpw(password, bcrypt.gensalt(int(self.rounds), self.prefix))
-            .decode("ascii")
-            .rsplit("$", 1)[1]
-        )
+        return password
 
-    def verify(self, raw_password, hashed_password):
-        password = raw_password.encode()
-        if self.digest is not None:
-            password = binascii.hexlify(self.digest(password).digest())
-        return bcrypt.checkpw(
-            password,
-            b"$"
-            + self.prefix
-            + b"$"
-            + str(self.rounds).encode()
-            + b"$"
-            + hashed_password.encode(),
-        )
+    def compute(self, password, salt, params):
+        prefix, rounds = params.split(",")
+        return bcrypt.hashpw(
+            self.digest_password(password), f"${prefix}${rounds}${salt}".encode()
+        ).decode("ascii")[-31:]
+
+    def verify_legacy(self, raw_password, hashed_password):
+        with self.limit(self.params):
+            return bcrypt.checkpw(
+                self.digest_password(raw_password),
+                b"$"
+                + self.prefix
+                + b"$"
+                + str(self.rounds).encode()
+                + b"$"
+                + hashed_password.encode(),
+            )
 
 
 class ScryptPasswordHasher(BasePasswordHasher):
+    algorithm = "scrypt"
+
     def __init__(
         self, block_size=8, parallelism=1, work_factor=2**14, maxmem=0, salt_length=32
     ):
@@ -154,19 +390,26 @@ class ScryptPasswordHasher(BasePasswordHasher):
         self.maxmem = maxmem
         self.salt_length = salt_length
 
-    def hash(self, password, salt=None):
-        salt = salt or generate_random_string(self.salt_length, symbol=False)
+    @property
+    def params(self):
+        return f"{self.work_factor},{self.block_size},{self.parallelism}"
+
+    def get_memory_usage(self, params):
+        work_factor, block_size, parallelism = map(int, params.split(","))
+        return 128 * work_factor * block_size
+
+    def compute(self, password, salt, params):
+        work_factor, block_size, parallelism = map(int, params.split(","))
         hash_ = hashlib.scrypt(
             password.encode(),
             salt=salt.encode(),
-            n=self.work_factor,
-            r=self.block_size,
-            p=self.parallelism,
+            n=work_factor,
+            r=block_size,
+            p=parallelism,
             maxmem=self.maxmem,
             dklen=64,
         )
-        hash_ = base64.b64encode(hash_).decode("ascii").strip()
-        return salt + hash_
+        return base64.b64encode(hash_).decode("ascii").strip()
 
 
 default = PBKDF2PasswordHasher(
@@ -0,0 +1,120 @@
+import os
+import heapq
+import hashlib
+import tempfile
+import itertools
+from django.core.management.base import BaseCommand, CommandError
+from jommerce.auth.validators import (
+    BREACHED_PASSWORDS_HEADER,
+    BREACHED_PASSWORDS_MAGIC,
+    get_breached_password_hash,
+)
+
+
+SHA1_SIZE = hashlib.sha1().digest_size
+
+
+def read_hashes(file, width, sha1):
+    # Lines are read as bytes: passwords that aren't valid UTF-8 are hashed
+    # as they are instead of being altered by decoding.
+    for number, line in enumerate(file, 1):
+        line = line.rstrip(b"\r\n")
+        if not line:
+            continue
+        if sha1:
+            # "<SHA-1 in hex>[:<count>]", e.g. the Pwned Passwords lists.
+            try:
+                digest = bytes.fromhex(line.split(b":", 1)[0].decode("ascii"))
+            except ValueError:
+                digest = None
+            if digest is None or len(digest) != SHA1_SIZE:
+                raise CommandError(f"Line {number}: not a SHA-1 hash in hex.")
+            yield digest[:width]
+        else:
+            yield get_breached_password_hash(line, width)
+
+
+def sort_chunks(hashes, chunk_size, directory):
+    """Sort `hashes` in chunks of `chunk_size` records, each in a temporary file."""
+    for chunk in iter(lambda: list(itertools.islice(hashes, chunk_size)), []):
+        chunk.sort()
+        file = tempfile.TemporaryFile(dir=directory)
+        file.write(b"".join(chunk))
+        file.seek(0)
+        yield file
+
+
+def read_records(file, width, block_size=64 * 1024):
+    while block := file.read(width * block_size):
+        for start in range(0, len(block), width):
+            yield block[start : start + width]
+
+
+class Command(BaseCommand):
+    help = (
+        "Build the file of the breached password validator from a list of "
+        "passwords, one per line."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("input", help="List of passwords, one per line.")
+        parser.add_argument("output", help="File to write.")
+        parser.add_argument(
+            "--sha1",
+            action="store_true",
+            help=(
+                "The lines are SHA-1 hashes in hex, optionally followed by "
+                '":<count>", instead of passwords.'
+            ),
+        )
+        parser.add_argument(
+            "--width",
+            type=int,
+            default=8,
+            help=(
+                f"Bytes of the SHA-1 hash kept per password, from 1 to {SHA1_SIZE}. "
+                "8 bytes make false positives negligible (default: 8)."
+            ),
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=10_000_000,
+            help="Number of hashes sorted in memory at once (default: 10000000).",
+        )
+
+    def handle(self, *args, input, output, sha1, width, chunk_size, **options):
+        if not 1 <= width <= SHA1_SIZE:
+            raise CommandError(
+                f"--width must be between 1 and {SHA1_SIZE}, the size of a SHA-1 hash."
+            )
+        directory = os.path.dirname(os.path.abspath(output))
+        with open(input, "rb") as file:
+            chunks = list(
+                sort_chunks(read_hashes(file, width, sha1), chunk_size, directory)
+            )
+        count = 0
+        # Written next to the output and renamed, so running workers keep
+        # reading the previous file until they restart.
+        with tempfile.NamedTemporaryFile(dir=directory, delete=False) as destination:
+            destination.write(
+                BREACHED_PASSWORDS_HEADER.pack(BREACHED_PASSWORDS_MAGIC, width)
+            )
+            previous = None
+            merged = heapq.merge(*(read_records(chunk, width) for chunk in chunks))
+            for record in merged:
+                if record != previous:
+                    destination.write(record)
+                    count += 1
+                    previous = record
+        for chunk in chunks:
+            chunk.close()
+        os.chmod(destination.name, 0o644)
+        os.replace(destination.name, output)
+        if options["verbosity"] >= 1:
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Wrote {count} password hashes to {output} "
+                    f"({os.path.getsize(output) / 1024 / 1024:.1f} MiB)."
+                )
+            )
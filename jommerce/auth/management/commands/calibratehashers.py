@@ -0,0 +1,189 @@
+import os
+import math
+import time
+from django.core.management.base import BaseCommand
+from jommerce.auth import hashers
+
+try:
+    import argon2
+except ImportError:
+    argon2 = None
+
+try:
+    import bcrypt
+except ImportError:
+    bcrypt = None
+
+KiB = 1024
+MiB = 1024 * KiB
+
+
+def benchmark(hasher, repeat=3):
+    """Return the fastest of `repeat` hashes with `hasher`, in seconds."""
+    salt = hasher.generate_salt()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        hasher.compute("password", salt, hasher.params)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def calibrate_pbkdf2(target, memory):
+    probe = hashers.PBKDF2PasswordHasher(iterations=10_000)
+    per_iteration = benchmark(probe) / probe.iterations
+    iterations = max(1000, int(target / per_iteration) // 1000 * 1000)
+    return hashers.PBKDF2PasswordHasher(iterations=iterations), 0
+
+
+def calibrate_scrypt(target, memory):
+    # scrypt uses 128 * work_factor * block_size bytes per hash.
+    block_size = 8
+    work_factor = 2 ** int(math.log2(max(memory // (128 * block_size), 2)))
+    while True:
+        hasher = hashers.ScryptPasswordHasher(
+            work_factor=work_factor,
+            block_size=block_size,
+            maxmem=2 * 128 * work_factor * block_size,
+        )
+        elapsed = benchmark(hasher)
+        if elapsed <= target or work_factor <= 2:
+            break
+        work_factor //= 2
+    # Spend the rest of the time budget on sequential passes, which use no extra memory.
+    hasher.parallelism = max(1, int(target / elapsed))
+    return hasher, 128 * work_factor * block_size
+
+
+def calibrate_argon2(target, memory):
+    memory_cost = max(memory // KiB, 8)
+    while True:
+        hasher = hashers.Argon2PasswordHasher(
+            time_cost=1, memory_cost=memory_cost, parallelism=1
+        )
+        elapsed = benchmark(hasher)
+        if elapsed <= target or memory_cost <= 8:
+            break
+        memory_cost //= 2
+    hasher.time_cost = max(1, int(target / elapsed))
+    return hasher, memory_cost * KiB
+
+
+def calibrate_bcrypt(target, memory):
+    probe = hashers.BcryptPasswordHasher(rounds=4)
+    # Each round doubles the cost.
+    rounds = 4 + max(0, int(math.log2(target / benchmark(probe))))
+    return hashers.BcryptPasswordHasher(rounds=min(rounds, 31)), 4 * KiB
+
+
+CALIBRATORS = {
+    "pbkdf2": calibrate_pbkdf2,
+    "scrypt": calibrate_scrypt,
+    "argon2": calibrate_argon2,
+    "bcrypt": calibrate_bcrypt,
+}
+
+ARGUMENTS = {
+    "pbkdf2": ("iterations",),
+    "scrypt": ("work_factor", "block_size", "parallelism", "maxmem"),
+    "argon2": ("time_cost", "memory_cost", "parallelism"),
+    "bcrypt": ("rounds",),
+}
+
+
+def get_arguments(name, hasher):
+    return ", ".join(
+        f"{argument}={int(getattr(hasher, argument))}" for argument in ARGUMENTS[name]
+    )
+
+
+def get_available_hashers():
+    available = ["pbkdf2", "scrypt"]
+    if argon2 is not None:
+        available.append("argon2")
+    if bcrypt is not None:
+        available.append("bcrypt")
+    return available
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the password hashers on this machine and recommend the "
+        "parameters that hit a target latency and memory budget."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--target-ms",
+            type=float,
+            default=250,
+            help="Target duration of a single hash, in milliseconds (default: 250).",
+        )
+        parser.add_argument(
+            "--memory-mib",
+            type=float,
+            default=256,
+            help=(
+                "Memory available for hashing, in MiB, shared by --concurrency "
+                "hashes (default: 256)."
+            ),
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=os.cpu_count(),
+            help=(
+                "Number of passwords hashed at the same time "
+                "(default: the number of CPUs)."
+            ),
+        )
+        parser.add_argument(
+            "--hasher",
+            dest="names",
+            action="append",
+            choices=list(CALIBRATORS),
+            help=(
+                "Only calibrate this hasher. Can be repeated "
+                "(default: all the installed ones)."
+            ),
+        )
+        parser.add_argument(
+            "--emit-settings",
+            action="store_true",
+            help="Print a Python module defining the calibrated hashers.",
+        )
+
+    def handle(self, *args, target_ms, memory_mib, concurrency, names, **options):
+        target = target_ms / 1000
+        memory = int(memory_mib * MiB / concurrency)
+        results = []
+        for name in names or get_available_hashers():
+            hasher, used_memory = CALIBRATORS[name](target, memory)
+            results.append((name, hasher, benchmark(hasher), used_memory))
+
+        if options["emit_settings"]:
+            self.emit_settings(results)
+            return
+
+        self.stdout.write(
+            f"Target: {target_ms:g} ms per hash, {memory / MiB:g} MiB per hash "
+            f"({concurrency} concurrent hashes)."
+        )
+        for name, hasher, elapsed, used_memory in results:
+            self.stdout.write(
+                f"{hasher.algorithm}: {get_arguments(name, hasher)}\n"
+                f"    {elapsed * 1000:.0f} ms per hash, "
+                f"{used_memory / MiB:.1f} MiB per hash, "
+                f"~{1 / elapsed:.1f} logins per second per core"
+            )
+
+    def emit_settings(self, results):
+        self.stdout.write("from jommerce.auth import hashers\n")
+        for name, hasher, elapsed, used_memory in results:
+            arguments = get_arguments(name, hasher)
+            self.stdout.write(f"{name} = hashers.{type(hasher).__name__}({arguments})")
+        self.stdout.write(
+            "\n# AUTH_PASSWORD_HASHERS = [\n"
+            + "".join(f'#     "myproject.hashers.{name}",\n' for name, *_ in results)
+            + "# ]"
+        )
@@ -0,0 +1,42 @@
+import time
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from jommerce.auth.models import Session
+
+
+class Command(BaseCommand):
+    help = "Delete expired sessions in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Maximum number of sessions deleted by each query (default: 1000).",
+        )
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=0.1,
+            help="Seconds to wait between two batches (default: 0.1).",
+        )
+
+    def handle(self, *args, batch_size, sleep, **options):
+        now = timezone.now()
+        expired_sessions = Session.objects.filter(expire_date__lte=now).order_by(
+            "expire_date"
+        )
+        total = 0
+        while True:
+            batch = list(expired_sessions.values_list("pk", flat=True)[:batch_size])
+            if not batch:
+                break
+            deleted, _ = Session.objects.filter(pk__in=batch).delete()
+            total += deleted
+            if options["verbosity"] >= 2:
+                self.stdout.write(f"Deleted {total} expired sessions so far.")
+            if len(batch) < batch_size:
+                break
+            time.sleep(sleep)
+        if options["verbosity"] >= 1:
+            self.stdout.write(self.style.SUCCESS(f"Deleted {total} expired sessions."))
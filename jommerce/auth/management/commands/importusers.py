@@ -0,0 +1,151 @@
+import os
+import csv
+import sys
+import json
+import time
+import contextlib
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, transaction
+from jommerce.auth.models import User
+from jommerce.auth.validators import get_password_policy
+
+FIELDS = {"email", "password", "password_hash", "status"}
+
+
+def read_csv(file):
+    yield from csv.DictReader(file)
+
+
+def read_jsonl(file):
+    for line in file:
+        if line.strip():
+            yield json.loads(line)
+
+
+READERS = {"csv": read_csv, "jsonl": read_jsonl}
+
+
+def validate(rows, validate_passwords=False):
+    policy = get_password_policy()
+    for number, row in enumerate(rows, 1):
+        # Empty CSV cells mean the column isn't set for this row.
+        row = {key: value for key, value in row.items() if value not in ("", None)}
+        if unknown := set(row) - FIELDS:
+            raise CommandError(f"Row {number}: unknown fields {sorted(unknown)}.")
+        if "email" not in row:
+            raise CommandError(f"Row {number}: missing email.")
+        if ("password" in row) == ("password_hash" in row):
+            raise CommandError(
+                f"Row {number}: expected either a password or a password_hash."
+            )
+        if validate_passwords and "password" in row:
+            if errors := policy.get_errors(row["password"]):
+                messages = [message for error in errors for message in error.messages]
+                raise CommandError(f"Row {number}: {' '.join(messages)}")
+        yield row
+
+
+class Command(BaseCommand):
+    help = (
+        "Create users from a CSV or JSON Lines file, hashing the passwords in "
+        "parallel and inserting the users in batches."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "path",
+            help="File to import, or - to read the standard input.",
+        )
+        parser.add_argument(
+            "--format",
+            choices=list(READERS),
+            help="Format of the file (default: guessed from its extension).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of users inserted by each query (default: 1000).",
+        )
+        parser.add_argument(
+            "--processes",
+            type=int,
+            default=os.cpu_count(),
+            help="Number of processes hashing passwords (default: the number of CPUs).",
+        )
+        parser.add_argument(
+            "--validate-passwords",
+            action="store_true",
+            help="Check raw passwords against AUTH_PASSWORD_VALIDATORS.",
+        )
+        parser.add_argument(
+            "--ignore-conflicts",
+            action="store_true",
+            help="Skip users whose email already exists instead of failing.",
+        )
+        parser.add_argument(
+            "--atomic",
+            action="store_true",
+            help=(
+                "Import all the users in a single transaction, so an invalid row "
+                "imports nothing (default: commit each batch)."
+            ),
+        )
+
+    def handle(self, *args, path, format, batch_size, processes, **options):
+        format = format or os.path.splitext(path)[1].lstrip(".").lower()
+        if format not in READERS:
+            raise CommandError("Unknown format, use --format csv or --format jsonl.")
+        start = time.perf_counter()
+        processed = 0
+
+        def report(total):
+            nonlocal processed
+            processed = total
+            if options["verbosity"] >= 2:
+                elapsed = time.perf_counter() - start
+                self.stdout.write(
+                    f"Processed {total} users so far ({total / elapsed:.0f} users/s)."
+                )
+
+        if path == "-":
+            file = contextlib.nullcontext(sys.stdin)
+        else:
+            file = open(path, newline="", encoding="utf-8")
+        if options["ignore_conflicts"]:
+            # bulk_create() can't tell how many rows were skipped.
+            count = User.objects.count()
+        if options["atomic"]:
+            atomic = transaction.atomic()
+        else:
+            atomic = contextlib.nullcontext()
+        try:
+            with file as file, atomic:
+                total = User.objects.bulk_create_users(
+                    validate(READERS[format](file), options["validate_passwords"]),
+                    batch_size=batch_size,
+                    processes=processes,
+                    ignore_conflicts=options["ignore_conflicts"],
+                    callback=report,
+                )
+        except (CommandError, DatabaseError) as error:
+            # Without --atomic, the batches before the error are committed.
+            if options["atomic"] or not processed:
+                raise CommandError(f"{error} No users were imported.") from error
+            raise CommandError(
+                f"{error} The {processed} users processed before were imported, "
+                f"run the command again with --ignore-conflicts to resume."
+            ) from error
+        elapsed = time.perf_counter() - start
+        if options["verbosity"] >= 1:
+            message = (
+                f"Processed {total} users in {elapsed:.1f} seconds "
+                f"({total / elapsed:.0f} users/s)."
+            )
+            if options["ignore_conflicts"]:
+                created = User.objects.count() - count
+                message += (
+                    f" {created} created, {max(0, total - created)} skipped "
+                    f"because their email already exists."
+                )
+            self.stdout.write(self.style.SUCCESS(message))
@@ -0,0 +1,74 @@
+import os
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+from django.db import models
+from .hashers import get_hashers, get_limiter
+
+
+class UserManager(models.Manager):
+    def bulk_create_users(
+        self,
+        rows,
+        batch_size=1000,
+        processes=None,
+        ignore_conflicts=False,
+        callback=None,
+    ):
+        """
+        Create users from an iterable of field dicts, read lazily. A row gives
+        either a raw "password", hashed with the first hasher across a pool of
+        `processes` processes, or a "password_hash" stored as is. Users are
+        inserted with `bulk_create` in batches of `batch_size` while the next
+        batch is hashed, and `callback` is called with the number of users
+        processed so far after each batch. Return the number of users processed,
+        which includes the rows skipped with `ignore_conflicts`.
+        """
+        processes = processes or os.cpu_count()
+        rows = iter(rows)
+        batches = iter(lambda: list(itertools.islice(rows, batch_size)), [])
+        if processes == 1:
+            return self.__bulk_create_users(batches, map, ignore_conflicts, callback)
+        # A forked worker could inherit the limiter's lock while it is held.
+        with ProcessPoolExecutor(
+            processes, initializer=get_limiter.cache_clear
+        ) as pool:
+
+            def map_(function, passwords):
+                chunksize = max(1, len(passwords) // processes)
+                return pool.map(function, passwords, chunksize=chunksize)
+
+            return self.__bulk_create_users(batches, map_, ignore_conflicts, callback)
+
+    def __bulk_create_users(self, batches, map_, ignore_conflicts, callback):
+        hasher = get_hashers()[0]
+        total = 0
+        pending = None
+        for batch in itertools.chain(batches, [None]):
+            if batch is not None:
+                # The pool's map submits every password at once, so the batch
+                # is hashed while the previous one is inserted.
+                passwords = [
+                    row["password"] for row in batch if "password_hash" not in row
+                ]
+                batch = (batch, map_(hasher.hash, passwords))
+            if pending is not None:
+                total += self.__insert_users(*pending, ignore_conflicts)
+                if callback is not None:
+                    callback(total)
+            pending = batch
+        return total
+
+    def __insert_users(self, rows, hashed_passwords, ignore_conflicts):
+        users = []
+        for row in rows:
+            fields = {
+                key: value for key, value in row.items() if key != "password_hash"
+            }
+            if "password_hash" in row:
+                fields["password"] = row["password_hash"]
+            else:
+                fields["password"] = next(hashed_passwords)
+            # Instantiated with the hash, so a later save() doesn't hash it again.
+            users.append(self.model(**fields))
+        self.bulk_create(users, ignore_conflicts=ignore_conflicts)
+        return len(users)
@@ -1,46 +1,198 @@
+import functools
 from .models import Session, AnonymousUser
+from .stores import get_session_store
 from django.http import HttpRequest
+from django.urls import Resolver404, resolve
 from django.utils import timezone
+from django.utils.functional import LazyObject, SimpleLazyObject, empty
 from .conf import settings
 from ipware import get_client_ip
 
+try:
+    from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+except ImportError:  # asgiref < 3.6
+    import asyncio
+    from asyncio import iscoroutinefunction
+
+    def markcoroutinefunction(func):
+        func._is_coroutine = asyncio.coroutines._is_coroutine
+        return func
+
+
+def is_evaluated(obj):
+    return not isinstance(obj, LazyObject) or obj._wrapped is not empty
+
+
+def is_expired(session):
+    return session.expire_date <= timezone.now()
+
+
+@functools.lru_cache(maxsize=1024)
+def is_sessionless(path, urlconf=None):
+    """
+    Return True if `path` matches AUTH_SESSION_EXEMPT_PATHS or is routed to a
+    view decorated with @sessionless.
+    """
+    for pattern in settings.AUTH_SESSION_EXEMPT_PATHS:
+        if isinstance(pattern, str):
+            if path.startswith(pattern):
+                return True
+        elif pattern.match(path):
+            return True
+    try:
+        match = resolve(path, urlconf)
+    except Resolver404:
+        return False
+    return getattr(match.func, "sessionless", False)
+
+
+def is_stale(session, user):
+    """
+    Return True if the user of `session` was deleted, or their sessions were
+    revoked (see User.revoke_sessions), while the session was cached or kept
+    in a signed cookie.
+    """
+    if user is None:
+        return session.user_id is not None
+    return session.is_revoked(user)
+
+
+async def aget_anonymous_user():
+    return AnonymousUser()
+
+
+def get_user(request):
+    if not hasattr(request, "_cached_user"):
+        user = None
+        if is_evaluated(request.session):
+            store = get_session_store()
+            user = store.load_user(request.session)
+            if is_stale(request.session, user):
+                # Replaced by an empty session, so the cookie is dropped.
+                store.delete(request.session)
+                request.session = Session()
+                user = None
+        request._cached_user = user or AnonymousUser()
+    return request._cached_user
+
+
+async def aget_user(request):
+    if not hasattr(request, "_cached_user"):
+        user = None
+        if is_evaluated(request.session):
+            store = get_session_store()
+            user = await store.aload_user(request.session)
+            if is_stale(request.session, user):
+                await store.adelete(request.session)
+                request.session = Session()
+                user = None
+        request._cached_user = user or AnonymousUser()
+    return request._cached_user
+
 
 class AuthenticationMiddleware:
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
 
     def __call__(self, request: HttpRequest):
-        try:
-            session = Session.objects.get(
-                pk=request.COOKIES.get(settings.AUTH_SESSION_COOKIE_NAME, None)
-            )
-        except Session.DoesNotExist:
-            request.session = Session()
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        if is_sessionless(request.path_info, getattr(request, "urlconf", None)):
             request.user = AnonymousUser()
-        else:
-            if session.expire_date <= timezone.now():
-                session.delete()
-                request.session = Session()
-            else:
-                request.session = session
-            request.user = session.user or AnonymousUser()
+            request.auser = aget_anonymous_user
+            return self.get_response(request)
 
-        if not Session.ip:
-            Session.ip = get_client_ip(request)[0]
+        store = get_session_store()
+        session = store.load(request.COOKIES.get(settings.session_cookie.name))
+        if session is not None and is_expired(session):
+            store.delete(session)
+            session = None
+
+        if session is None:
+            # A new session is only created when the view actually uses it.
+            request.session = SimpleLazyObject(Session)
+        else:
+            request.session = session
+        # The user is only loaded if the view uses it.
+        request.user = SimpleLazyObject(lambda: get_user(request))
+        request.auser = lambda: aget_user(request)
 
         response = self.get_response(request)
 
-        request.session.save()
+        if not is_evaluated(request.session):
+            return response
+
+        if not request.session.ip:
+            request.session.ip = get_client_ip(request)[0]
+        renewed = session is not None and request.session.renew()
+
+        return self.set_cookie(request, response, store.save(request.session), renewed)
+
+    async def __acall__(self, request: HttpRequest):
+        if is_sessionless(request.path_info, getattr(request, "urlconf", None)):
+            request.user = AnonymousUser()
+            request.auser = aget_anonymous_user
+            return await self.get_response(request)
+
+        store = get_session_store()
+        session = await store.aload(request.COOKIES.get(settings.session_cookie.name))
+        if session is not None and is_expired(session):
+            await store.adelete(session)
+            session = None
+
+        if session is None:
+            request.session = SimpleLazyObject(Session)
+        else:
+            request.session = session
+        # The user is loaded on first use, either with "await request.auser()"
+        # or by accessing request.user from synchronous code.
+        request.user = SimpleLazyObject(lambda: get_user(request))
+        request.auser = lambda: aget_user(request)
+
+        response = await self.get_response(request)
+
+        if not is_evaluated(request.session):
+            return response
+
+        if not request.session.ip:
+            request.session.ip = get_client_ip(request)[0]
+        renewed = session is not None and request.session.renew()
+
+        return self.set_cookie(
+            request, response, await store.asave(request.session), renewed
+        )
 
-        if request.session.user:
+    def set_cookie(self, request, response, session_key, renewed=False):
+        cookie = settings.session_cookie
+        if session_key is None:
+            if get_session_store().stateless and cookie.name in request.COOKIES:
+                response.delete_cookie(
+                    cookie.name,
+                    path=cookie.path,
+                    domain=cookie.domain,
+                    samesite=cookie.samesite,
+                )
+        elif (
+            renewed
+            or settings.AUTH_SESSION_RENEWAL_INTERVAL is None
+            or session_key != request.COOKIES.get(cookie.name)
+        ):
+            # With sliding expiration, the cookie is only sent again when
+            # its value or its expiration date changes.
             response.set_cookie(
-                settings.AUTH_SESSION_COOKIE_NAME,
-                request.session.id,
+                cookie.name,
+                session_key,
                 expires=request.session.expire_date,
-                domain=settings.AUTH_SESSION_COOKIE_DOMAIN,
-                path=settings.AUTH_SESSION_COOKIE_PATH,
-                secure=settings.AUTH_SESSION_COOKIE_SECURE,
-                httponly=settings.AUTH_SESSION_COOKIE_HTTPONLY,
-                samesite=settings.AUTH_SESSION_COOKIE_SAMESITE,
+                domain=cookie.domain,
+                path=cookie.path,
+                secure=cookie.secure,
+                httponly=cookie.httponly,
+                samesite=cookie.samesite,
             )
         return response
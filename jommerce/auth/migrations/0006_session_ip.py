@@ -0,0 +1,19 @@
+# Generated by Django 4.2.30 on 2026-10-18 15:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("auth", "0005_user_status"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="session",
+            name="ip",
+            field=models.GenericIPAddressField(
+                blank=True, null=True, verbose_name="IP"
+            ),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.30 on 2026-10-18 15:54
+
+from django.db import migrations, models
+import jommerce.auth.models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("auth", "0006_session_ip"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="session",
+            name="id",
+            field=models.CharField(
+                default=jommerce.auth.models.generate_session_id,
+                max_length=64,
+                primary_key=True,
+                serialize=False,
+                verbose_name="id",
+            ),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-18 15:57
+
+from django.db import migrations, models
+import jommerce.auth.models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("auth", "0007_alter_session_id"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="session",
+            name="expire_date",
+            field=models.DateTimeField(
+                blank=True,
+                db_index=True,
+                default=jommerce.auth.models.get_default_expire_date,
+                verbose_name="expire_date",
+            ),
+        ),
+    ]
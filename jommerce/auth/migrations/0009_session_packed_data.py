@@ -0,0 +1,54 @@
+from django.db import migrations
+import jommerce.auth.fields
+
+
+def copy_data(apps, schema_editor, source, target, batch_size=1000):
+    Session = apps.get_model("auth", "Session")
+    sessions = Session.objects.using(schema_editor.connection.alias).only("id", source)
+    batch = []
+    for session in sessions.iterator(chunk_size=batch_size):
+        setattr(session, target, getattr(session, source))
+        batch.append(session)
+        if len(batch) == batch_size:
+            Session.objects.using(schema_editor.connection.alias).bulk_update(
+                batch, [target]
+            )
+            batch = []
+    if batch:
+        Session.objects.using(schema_editor.connection.alias).bulk_update(
+            batch, [target]
+        )
+
+
+def pack_data(apps, schema_editor):
+    copy_data(apps, schema_editor, "data", "packed_data")
+
+
+def unpack_data(apps, schema_editor):
+    copy_data(apps, schema_editor, "packed_data", "data")
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("auth", "0008_session_expire_date_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="session",
+            name="packed_data",
+            field=jommerce.auth.fields.SessionDataField(
+                blank=True, default=dict, verbose_name="data"
+            ),
+        ),
+        migrations.RunPython(pack_data, unpack_data, hints={"model_name": "session"}),
+        migrations.RemoveField(
+            model_name="session",
+            name="data",
+        ),
+        migrations.RenameField(
+            model_name="session",
+            old_name="packed_data",
+            new_name="data",
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.30 on 2026-10-18 16:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+from jommerce.auth.conf import settings
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("auth", "0009_session_packed_data"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="session",
+            name="user",
+            field=models.ForeignKey(
+                db_constraint=False,
+                default=None,
+                null=True,
+                on_delete=django.db.models.deletion.DO_NOTHING,
+                related_name="sessions",
+                to=settings.AUTH_USER_MODEL,
+                verbose_name="user",
+            ),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.30 on 2026-10-18 16:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("auth", "0010_session_user_on_delete"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="session",
+            name="generation",
+            # Existing sessions belong to the first generation of their user.
+            field=models.PositiveIntegerField(
+                blank=True, default=0, null=True, verbose_name="generation"
+            ),
+        ),
+        migrations.AlterField(
+            model_name="session",
+            name="generation",
+            field=models.PositiveIntegerField(
+                blank=True, default=None, null=True, verbose_name="generation"
+            ),
+        ),
+        migrations.AddField(
+            model_name="user",
+            name="session_generation",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="session generation"
+            ),
+        ),
+    ]
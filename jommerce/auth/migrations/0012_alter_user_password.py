@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-18 16:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("auth", "0011_session_generation"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="user",
+            name="password",
+            field=models.CharField(max_length=256, verbose_name="password"),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.30 on 2026-10-18 16:16
+
+from django.db import migrations, models
+import jommerce.auth.validators
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("auth", "0012_alter_user_password"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="user",
+            name="password",
+            field=models.CharField(
+                max_length=256,
+                validators=[jommerce.auth.validators.validate_password],
+                verbose_name="password",
+            ),
+        ),
+    ]
@@ -1,10 +1,20 @@
-from django.db import models
+import logging
+import secrets
+from asgiref.sync import sync_to_async
+from django.db import models, connections, router, transaction, IntegrityError
+from django.db.models import F
 from .conf import settings
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
-from .validators import get_password_validators, get_username_validators
-from .utils import generate_random_string
-from .hashers import get_hashers
+from django.db.models.signals import pre_delete
+from django.dispatch import receiver
+from .validators import validate_password, get_username_validators
+from .hashers import get_hashers, get_executor, check_password, acheck_password
+from .fields import SessionDataField
+from .managers import UserManager
+from . import stores
+
+logger = logging.getLogger(__name__)
 
 
 class User(models.Model):
@@ -14,11 +24,16 @@ class User(models.Model):
 
     email = models.EmailField(_("email"), max_length=64, unique=True)
     password = models.CharField(
-        _("password"), max_length=128, validators=get_password_validators()
+        _("password"), max_length=256, validators=[validate_password]
     )
     status = models.SmallIntegerField(
         _("status"), choices=Status.choices, default=Status.INACTIVE
     )
+    session_generation = models.PositiveIntegerField(
+        _("session generation"), default=0, editable=False
+    )
+
+    objects = UserManager()
 
     __original_password = None
 
@@ -31,11 +46,47 @@ class User(models.Model):
         self.__original_password = self.password
 
     def save(self, *args, **kwargs):
-        if self.pk is None or self.__original_password != self.password:
-            hasher = get_hashers()[0]
-            self.password = hasher.hash(self.password)
+        if self.__is_password_changed():
+            self.password = get_hashers()[0].hash(self.password)
+        self.__save(*args, **kwargs)
+
+    async def asave(self, *args, **kwargs):
+        if self.__is_password_changed():
+            self.password = await get_hashers()[0].ahash(self.password)
+        await sync_to_async(self.__save)(*args, **kwargs)
+
+    def __is_password_changed(self):
+        return self.pk is None or self.__original_password != self.password
+
+    def __save(self, *args, **kwargs):
+        if not (args or kwargs or self._state.adding):
+            kwargs["update_fields"] = self.__get_update_fields()
         super().save(*args, **kwargs)
         self.__original_password = self.password
+        stores.get_session_store().evict_user(self.pk)
+
+    def __get_update_fields(self):
+        """
+        Return the loaded fields written by a plain save() of an existing user.
+        `session_generation` is only changed by revoke_sessions, so saving an
+        instance loaded before a revocation can't write the old counter back.
+        `password` is only written when it was changed, so a hash upgraded by
+        rehash_password in the background isn't overwritten either.
+        """
+        excluded_fields = self.get_deferred_fields() | {"session_generation"}
+        if self.password == self.__original_password:
+            excluded_fields.add("password")
+        return [
+            field.name
+            for field in self._meta.concrete_fields
+            if not field.primary_key and field.attname not in excluded_fields
+        ]
+
+    def delete(self, *args, **kwargs):
+        user_id = self.pk
+        result = super().delete(*args, **kwargs)
+        stores.get_session_store().evict_user(user_id)
+        return result
 
     @property
     def is_anonymous(self):
@@ -53,25 +104,92 @@ class User(models.Model):
         """
         return True
 
+    def revoke_sessions(self, except_current=None):
+        """
+        Log the user out of all their sessions except `except_current` with a
+        single DELETE, and bump `session_generation` so the sessions that are
+        still cached or kept in signed cookies are rejected by the middleware.
+        `except_current` is moved to the new generation and must be saved,
+        which the middleware does for request.session.
+        """
+        sessions = Session.objects.filter(user_id=self.pk)
+        if except_current is not None:
+            sessions = sessions.exclude(pk=except_current.pk)
+        session_keys = list(sessions.values_list("pk", flat=True))
+        sessions.delete()
+        users = self.__class__._default_manager.filter(pk=self.pk)
+        users.update(session_generation=F("session_generation") + 1)
+        self.session_generation = users.values_list(
+            "session_generation", flat=True
+        ).get()
+        store = stores.get_session_store()
+        for session_key in session_keys:
+            store.evict(session_key)
+        store.evict_user(self.pk)
+        if except_current is not None:
+            except_current.generation = self.session_generation
+
     def verify_password(self, raw_password):
-        need_rehash = False
-        for hasher in get_hashers():
-            if hasher.verify(raw_password, self.password):
-                if need_rehash:
-                    self.password = raw_password
-                    self.save()
-                return True
-            need_rehash = True
-        return False
+        verified, need_rehash = check_password(raw_password, self.password)
+        if need_rehash:
+            self.rehash_password(raw_password)
+        return verified
+
+    async def averify_password(self, raw_password):
+        """
+        Like `verify_password`, but hash in a thread pool instead of blocking
+        the event loop.
+        """
+        verified, need_rehash = await acheck_password(raw_password, self.password)
+        if need_rehash:
+            if settings.AUTH_PASSWORD_REHASH_IN_BACKGROUND:
+                self.rehash_password(raw_password)
+            else:
+                await sync_to_async(self.rehash_password)(raw_password)
+        return verified
+
+    def rehash_password(self, raw_password):
+        """
+        Hash `raw_password` with the first hasher and store it with a
+        conditional UPDATE, unless the password has been changed in the
+        meantime. With AUTH_PASSWORD_REHASH_IN_BACKGROUND, this runs in the
+        hashers' thread pool and a Future is returned.
+        """
+        if settings.AUTH_PASSWORD_REHASH_IN_BACKGROUND:
+            return get_executor().submit(
+                self.__rehash_password_in_background, raw_password, self.password
+            )
+        password = self.__rehash_password(raw_password, self.password)
+        if password is not None:
+            self.password = self.__original_password = password
+
+    def __rehash_password(self, raw_password, hashed_password):
+        password = get_hashers()[0].hash(raw_password)
+        users = self.__class__._default_manager.filter(
+            pk=self.pk, password=hashed_password
+        )
+        if not users.update(password=password):
+            return None
+        stores.get_session_store().evict_user(self.pk)
+        return password
+
+    def __rehash_password_in_background(self, raw_password, hashed_password):
+        try:
+            self.__rehash_password(raw_password, hashed_password)
+        except Exception:
+            logger.exception("Failed to rehash the password of user %s", self.pk)
+            raise
+        finally:
+            # Unlike request threads, pool threads never close their connections.
+            connections.close_all()
 
 
 def generate_session_id():
-    while True:
-        session_id = generate_random_string(32)
-        try:
-            Session.objects.get(pk=session_id)
-        except Session.DoesNotExist:
-            return session_id
+    """
+    Return a random URL-safe session id with 384 bits of entropy. Uniqueness is
+    enforced by the primary key when the session is inserted.
+    """
+    return secrets.token_urlsafe(48)
 
 
 def get_default_expire_date():
@@ -80,29 +198,54 @@ def get_default_expire_date():
 
 class Session(models.Model):
     id = models.CharField(
-        _("id"), max_length=32, primary_key=True, default=generate_session_id
+        _("id"), max_length=64, primary_key=True, default=generate_session_id
     )
     user = models.ForeignKey(
         to=settings.AUTH_USER_MODEL,
-        on_delete=models.CASCADE,
+        # Sessions may live in another database than users (AUTH_SESSION_DATABASE),
+        # so they are deleted with their user by `delete_user_sessions`.
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
         related_name="sessions",
         verbose_name=_("user"),
         null=True,
         default=None,
     )
     expire_date = models.DateTimeField(
-        _("expire_date"), blank=True, default=get_default_expire_date
+        _("expire_date"),
+        blank=True,
+        default=get_default_expire_date,
+        db_index=True,
+    )
+    data = SessionDataField(_("data"), default=dict, blank=True)
+    ip = models.GenericIPAddressField(_("IP"), null=True, blank=True)
+    # The session generation of the user when they logged in (see User.revoke_sessions).
+    generation = models.PositiveIntegerField(
+        _("generation"), null=True, blank=True, default=None
     )
-    data = models.JSONField(_("data"), default=dict, blank=True)
-    ip = models.GenericIPAddressField(_("IP"))
 
     modified = False
     accessed = False
+    # Set when the row was deleted by someone else before the session was saved.
+    dropped = False
+
+    __original_values = None
+    tracked_fields = ("user", "expire_date", "ip", "generation")
 
     class Meta:
         verbose_name = _("session")
         verbose_name_plural = _("sessions")
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.__original_values = self.__get_tracked_values()
+
+    def __get_tracked_values(self):
+        return {
+            name: getattr(self, self._meta.get_field(name).attname)
+            for name in self.tracked_fields
+        }
+
     def __contains__(self, item):
         self.accessed = True
         return item in self.data
@@ -120,9 +263,138 @@ class Session(models.Model):
         self.modified = True
         del self.data[key]
 
+    def get_changed_fields(self):
+        """Return the names of the fields changed since the session was loaded."""
+        changed_fields = [
+            name
+            for name, value in self.__get_tracked_values().items()
+            if self.__original_values[name] != value
+        ]
+        if self.modified:
+            changed_fields.append("data")
+        return changed_fields
+
+    def renew(self):
+        """
+        Push the expiration date forward if at least AUTH_SESSION_RENEWAL_INTERVAL
+        seconds have passed since it was last set. Return True if the session was renewed.
+        """
+        if settings.AUTH_SESSION_RENEWAL_INTERVAL is None:
+            return False
+        expire_date = get_default_expire_date()
+        interval = timezone.timedelta(seconds=settings.AUTH_SESSION_RENEWAL_INTERVAL)
+        if expire_date - self.expire_date < interval:
+            return False
+        self.expire_date = expire_date
+        return True
+
+    def update_generation(self):
+        """
+        Bind the session to the current generation of the sessions of its
+        user when the user logs in.
+        """
+        if self.user_id is not None and (
+            self.generation is None or self.user_id != self.__original_values["user"]
+        ):
+            self.generation = self.user.session_generation
+
+    def is_revoked(self, user):
+        """Return True if the sessions of `user` were revoked after this one."""
+        return (
+            self.generation is not None and self.generation != user.session_generation
+        )
+
+    @property
+    def is_empty(self):
+        return self.user_id is None and not self.data
+
+    @property
+    def is_unchanged(self):
+        """
+        Whether save() would leave the database as is, so async code can skip
+        the hop to a thread.
+        """
+        if self._state.adding:
+            return self.is_empty
+        return not (
+            self.is_empty
+            or self.get_changed_fields()
+            # Bound to the current generation on save (see update_generation).
+            or (self.user_id is not None and self.generation is None)
+        )
+
     def save(self, *args, **kwargs):
-        if self.user or self.data:
-            return super().save(args, kwargs)
+        if self.is_empty:
+            if not self._state.adding:
+                # Nothing is left to keep (e.g. after logout).
+                self.delete()
+            return
+        self.update_generation()
+        if args or kwargs:
+            super().save(*args, **kwargs)
+        elif self._state.adding:
+            self.__insert()
+        else:
+            changed_fields = self.get_changed_fields()
+            if not changed_fields:
+                return
+            if not self.__update(changed_fields):
+                # Deleted by a concurrent logout, revoke_sessions, clearsessions
+                # or the deletion of the user: don't bring it back.
+                self.dropped = True
+                stores.get_session_store().evict(self.pk)
+                return
+        self.modified = False
+        self.__original_values = self.__get_tracked_values()
+        stores.get_session_store().refresh(self)
+
+    def __update(self, fields):
+        """
+        Write `fields` with a single UPDATE and return the number of updated
+        rows. Unlike save(update_fields=...), a missing row doesn't raise and
+        break the surrounding transaction.
+        """
+        using = router.db_for_write(self.__class__, instance=self)
+        values = {
+            field.attname: getattr(self, field.attname)
+            for field in map(self._meta.get_field, fields)
+        }
+        return (
+            self.__class__._base_manager.using(using)
+            .filter(pk=self.pk)
+            .update(**values)
+        )
+
+    def __insert(self, attempts=3):
+        using = router.db_for_write(self.__class__, instance=self)
+        for attempt in range(1, attempts + 1):
+            try:
+                with transaction.atomic(using=using):
+                    return super().save(force_insert=True, using=using)
+            except IntegrityError:
+                if attempt == attempts:
+                    raise
+                self.id = generate_session_id()
+
+    def delete(self, *args, **kwargs):
+        session_key = self.pk
+        result = super().delete(*args, **kwargs)
+        stores.get_session_store().evict(session_key)
+        return result
+
+    def cycle_key(self):
+        """
+        Move the session to a new id, keeping its data, so an id planted in the
+        browser before the user logs in can't be used to hijack their session.
+        The old row is deleted and the session is inserted again when saved.
+        """
+        if not self._state.adding:
+            self.delete()
+            self._state.adding = True
+        self.id = generate_session_id()
+
+    async def acycle_key(self):
+        await sync_to_async(self.cycle_key)()
 
     def get(self, key, default=None):
         """Return the value for key if key is in the dictionary, else default."""
@@ -166,3 +438,14 @@ class AnonymousUser:
     @property
     def is_authenticated(self):
         return False
+
+
+@receiver(pre_delete, sender=settings.AUTH_USER_MODEL)
+def delete_user_sessions(sender, instance, **kwargs):
+    sessions = Session.objects.filter(user_id=instance.pk)
+    # Deleted with a single query, so each session is evicted from the store.
+    session_keys = list(sessions.values_list("pk", flat=True))
+    sessions.delete()
+    store = stores.get_session_store()
+    for session_key in session_keys:
+        store.evict(session_key)
@@ -0,0 +1,52 @@
+from django.db import router
+from .conf import settings
+
+
+def is_session(model):
+    return model._meta.app_label == "auth" and model._meta.model_name == "session"
+
+
+def is_user_model(app_label, model_name):
+    return f"{app_label}.{model_name}" == settings.AUTH_USER_MODEL.lower()
+
+
+class SessionRouter:
+    """
+    Route the Session model to the AUTH_SESSION_DATABASE database alias.
+    """
+
+    def db_for_read(self, model, **hints):
+        return self._db_for(model, router.db_for_read, **hints)
+
+    def db_for_write(self, model, **hints):
+        return self._db_for(model, router.db_for_write, **hints)
+
+    def _db_for(self, model, route, **hints):
+        if settings.AUTH_SESSION_DATABASE is None:
+            return None
+        if is_session(model):
+            return settings.AUTH_SESSION_DATABASE
+        instance = hints.get("instance")
+        if instance is not None and is_session(instance):
+            # Don't follow a session to its database when loading its user.
+            return route(model)
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if settings.AUTH_SESSION_DATABASE is None:
+            return None
+        if is_session(obj1) or is_session(obj2):
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if settings.AUTH_SESSION_DATABASE is None:
+            return None
+        if app_label == "auth" and model_name == "session":
+            return db == settings.AUTH_SESSION_DATABASE
+        if db == settings.AUTH_SESSION_DATABASE:
+            # 0001_initial creates the session table with a foreign key to the
+            # user table, which 0010 drops. The user table is created too so
+            # that the constraint can be created in between, and stays empty.
+            return model_name is not None and is_user_model(app_label, model_name)
+        return None
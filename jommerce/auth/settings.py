@@ -11,7 +11,31 @@ AUTH_USERNAME_VALIDATORS = [
     "jommerce.auth.validators.username.ascii",
     "jommerce.auth.validators.username.identifier",
 ]
+# The file built by the buildbreachedpasswords command, used by the
+# "jommerce.auth.validators.password.breached" validator.
+AUTH_BREACHED_PASSWORDS_PATH = None
 AUTH_PASSWORD_HASHERS = ["jommerce.auth.hashers.default"]
+# The number of threads that hash passwords for the async API (e.g. User.averify_password).
+# None uses the number of CPUs.
+AUTH_PASSWORD_HASHER_MAX_WORKERS = None
+# Whether passwords verified with an outdated hasher are hashed again in the hashers'
+# thread pool, so the login response doesn't wait for a second hash.
+AUTH_PASSWORD_REHASH_IN_BACKGROUND = True
+# The memory, in bytes, that the password hashes running at the same time may use.
+# Other hashes wait for memory to be released. None disables the limit.
+AUTH_PASSWORD_HASHER_MEMORY_BUDGET = None
+# Seconds a hash waits for memory before jommerce.auth.hashers.HasherOverloaded is raised.
+AUTH_PASSWORD_HASHER_QUEUE_TIMEOUT = 10
+# Token bucket rates of the login and signup views, per client IP and per email,
+# as "<number of requests>/<second|minute|hour|day>". None disables a bucket.
+AUTH_THROTTLE_RATES = {
+    "login_ip": "30/minute",
+    "login_email": "10/minute",
+    "signup_ip": "10/minute",
+    "signup_email": "5/minute",
+}
+# The cache alias where the token buckets are stored.
+AUTH_THROTTLE_CACHE = "default"
 AUTH_LOGIN_URL = "/auth/login/"
 AUTH_LOGIN_REDIRECT_URL = "/"
 AUTH_LOGOUT_REDIRECT_URL = "/"
@@ -20,12 +44,25 @@ AUTH_USER_MODEL = "auth.User"
 
 # Sessions
 # ----------------------------------------------------------------------------------------------------------------------
+# Where sessions are loaded from and saved to.
+AUTH_SESSION_STORE = "jommerce.auth.stores.database"
+# The database alias of the Session model, used by jommerce.auth.routers.SessionRouter.
+# None keeps sessions in the same database as the other models.
+AUTH_SESSION_DATABASE = None
+# Path prefixes or compiled regular expressions of request.path_info for which
+# no session is loaded and request.user is anonymous (e.g. health checks, static files).
+AUTH_SESSION_EXEMPT_PATHS = []
 # Cookie name. This can be whatever you want.
 AUTH_SESSION_COOKIE_NAME = "session_key"
 # Age of cookie, in seconds (default: 2 weeks).
 AUTH_SESSION_COOKIE_AGE = 60 * 60 * 24 * 7 * 2
+# Push the expiration date of active sessions forward at most once per this many seconds.
+# None disables sliding expiration.
+AUTH_SESSION_RENEWAL_INTERVAL = None
 # A string like "example.com", or None for standard domain cookie.
 AUTH_SESSION_COOKIE_DOMAIN = None
+# Session data at least this many bytes long is compressed with zlib. None disables compression.
+AUTH_SESSION_DATA_COMPRESS_MIN_LENGTH = 1024
 # Whether the session cookie should be secure (https:// only).
 AUTH_SESSION_COOKIE_SECURE = False
 # The path of the session cookie.
@@ -0,0 +1,432 @@
+import time
+import pickle
+import functools
+import threading
+from datetime import datetime, timezone
+from abc import ABC, abstractmethod
+from asgiref.sync import sync_to_async
+from collections import OrderedDict
+from django.core import signing
+from django.core.cache import caches
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import router
+from django.utils.module_loading import import_string
+from .conf import settings
+from . import models
+
+
+@functools.lru_cache
+def get_session_store():
+    return import_string(settings.AUTH_SESSION_STORE)
+
+
+def dump_instance(instance):
+    return {
+        field.attname: getattr(instance, field.attname)
+        for field in instance._meta.concrete_fields
+    }
+
+
+def load_instance(model, values):
+    return model.from_db(router.db_for_read(model), list(values), list(values.values()))
+
+
+class LocalCache:
+    """
+    A thread-safe in-process LRU cache whose entries expire after `timeout` seconds.
+    """
+
+    def __init__(self, max_size=1024, timeout=5):
+        self.max_size = max_size
+        self.timeout = timeout
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                expire_time, value = self._data[key]
+            except KeyError:
+                return default
+            if expire_time <= time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.timeout, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class BaseSessionStore(ABC):
+    # Whether sessions only live in the cookie, so the cookie itself must be
+    # deleted to end a session.
+    stateless = False
+
+    @abstractmethod
+    def load(self, session_key):
+        """Return the session identified by `session_key` or None."""
+
+    @abstractmethod
+    def save(self, session):
+        """
+        Persist the session and return the value of the session cookie, or None
+        if there is nothing to keep.
+        """
+
+    @abstractmethod
+    def delete(self, session):
+        pass
+
+    def load_user(self, session):
+        try:
+            return session.user
+        except ObjectDoesNotExist:
+            # The user was deleted after the session was loaded or cached.
+            return None
+
+    async def aload(self, session_key):
+        return await sync_to_async(self.load)(session_key)
+
+    async def asave(self, session):
+        return await sync_to_async(self.save)(session)
+
+    async def adelete(self, session):
+        return await sync_to_async(self.delete)(session)
+
+    async def aload_user(self, session):
+        return await sync_to_async(self.load_user)(session)
+
+    def refresh(self, session):
+        """Called after a session has been written to the database."""
+
+    def evict(self, session_key):
+        """Called after a session has been deleted from the database."""
+
+    def evict_user(self, user_id):
+        """Called after a user has been changed or deleted."""
+
+
+class DatabaseSessionStore(BaseSessionStore):
+    def __init__(self, select_related_user=False):
+        # Load the user with the session in a single query. Useful when most
+        # requests use request.user.
+        self.select_related_user = select_related_user
+
+    def get_queryset(self):
+        queryset = models.Session.objects.all()
+        # A join is only possible when sessions and users share a database.
+        if self.select_related_user and router.db_for_read(
+            models.Session
+        ) == router.db_for_read(models.Session.user.field.related_model):
+            queryset = queryset.select_related("user")
+        return queryset
+
+    def load(self, session_key):
+        if not session_key:
+            return None
+        try:
+            return self.get_queryset().get(pk=session_key)
+        except models.Session.DoesNotExist:
+            return None
+
+    def save(self, session):
+        session.save()
+        return None if session.is_empty or session.dropped else session.pk
+
+    def delete(self, session):
+        session.delete()
+
+    async def asave(self, session):
+        if session.is_unchanged:
+            return None if session.is_empty else session.pk
+        return await super().asave(session)
+
+    async def aload(self, session_key):
+        if not session_key:
+            return None
+        try:
+            return await self.get_queryset().aget(pk=session_key)
+        except models.Session.DoesNotExist:
+            return None
+
+    async def aload_user(self, session):
+        if session.user_id is None:
+            return None
+        if models.Session.user.is_cached(session):
+            return session.user
+        user_model = models.Session.user.field.related_model
+        try:
+            session.user = await user_model._default_manager.aget(pk=session.user_id)
+        except user_model.DoesNotExist:
+            return None
+        return session.user
+
+
+class CachedSessionStore(DatabaseSessionStore):
+    """
+    Read-through session store. Sessions and their users are looked up in an
+    in-process LRU cache first, then in a Django cache backend and finally in the
+    database. Saved sessions are written through to both caches.
+    """
+
+    def __init__(
+        self,
+        cache_alias="default",
+        timeout=60 * 5,
+        local_max_size=1024,
+        local_timeout=5,
+        key_prefix="jommerce.auth",
+        select_related_user=False,
+    ):
+        super().__init__(select_related_user=select_related_user)
+        self.cache_alias = cache_alias
+        self.timeout = timeout
+        self.key_prefix = key_prefix
+        self.local_cache = LocalCache(max_size=local_max_size, timeout=local_timeout)
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias]
+
+    def get_session_cache_key(self, session_key):
+        return f"{self.key_prefix}.session:{session_key}"
+
+    def get_user_cache_key(self, user_id):
+        return f"{self.key_prefix}.user:{user_id}"
+
+    def _get(self, model, key, fetch):
+        values = self.local_cache.get(key)
+        if values is not None:
+            return load_instance(model, pickle.loads(values))
+        values = self.cache.get(key)
+        if values is not None:
+            instance = load_instance(model, values)
+        else:
+            instance = fetch()
+            if instance is None:
+                return None
+            values = dump_instance(instance)
+            self.cache.set(key, values, self.timeout)
+        self.local_cache.set(key, pickle.dumps(values, pickle.HIGHEST_PROTOCOL))
+        return instance
+
+    async def _aget(self, model, key, fetch):
+        values = self.local_cache.get(key)
+        if values is not None:
+            return load_instance(model, pickle.loads(values))
+        values = await self.cache.aget(key)
+        if values is not None:
+            instance = load_instance(model, values)
+        else:
+            instance = await fetch()
+            if instance is None:
+                return None
+            values = dump_instance(instance)
+            await self.cache.aset(key, values, self.timeout)
+        self.local_cache.set(key, pickle.dumps(values, pickle.HIGHEST_PROTOCOL))
+        return instance
+
+    def _set(self, key, values):
+        self.cache.set(key, values, self.timeout)
+        self.local_cache.set(key, pickle.dumps(values, pickle.HIGHEST_PROTOCOL))
+
+    def _delete(self, key):
+        self.cache.delete(key)
+        self.local_cache.delete(key)
+
+    def _cache_related_user(self, session):
+        if session is not None and models.Session.user.is_cached(session):
+            if session.user is not None:
+                self._set(
+                    self.get_user_cache_key(session.user_id),
+                    dump_instance(session.user),
+                )
+        return session
+
+    def load(self, session_key):
+        if not session_key:
+            return None
+        return self._get(
+            models.Session,
+            self.get_session_cache_key(session_key),
+            lambda: self._cache_related_user(
+                super(CachedSessionStore, self).load(session_key)
+            ),
+        )
+
+    def load_user(self, session):
+        if session.user_id is None:
+            return None
+        if models.Session.user.is_cached(session):
+            return session.user
+        user = self._get(
+            models.Session.user.field.related_model,
+            self.get_user_cache_key(session.user_id),
+            lambda: super(CachedSessionStore, self).load_user(session),
+        )
+        if user is not None:
+            session.user = user
+        return user
+
+    async def aload(self, session_key):
+        if not session_key:
+            return None
+        return await self._aget(
+            models.Session,
+            self.get_session_cache_key(session_key),
+            lambda: self._afetch_session(session_key),
+        )
+
+    async def _afetch_session(self, session_key):
+        session = await super().aload(session_key)
+        if session is not None and models.Session.user.is_cached(session):
+            if session.user is not None:
+                key = self.get_user_cache_key(session.user_id)
+                values = dump_instance(session.user)
+                await self.cache.aset(key, values, self.timeout)
+                self.local_cache.set(key, pickle.dumps(values, pickle.HIGHEST_PROTOCOL))
+        return session
+
+    async def aload_user(self, session):
+        if session.user_id is None:
+            return None
+        if models.Session.user.is_cached(session):
+            return session.user
+        user = await self._aget(
+            models.Session.user.field.related_model,
+            self.get_user_cache_key(session.user_id),
+            lambda: super(CachedSessionStore, self).aload_user(session),
+        )
+        if user is not None:
+            session.user = user
+        return user
+
+    def refresh(self, session):
+        self._set(self.get_session_cache_key(session.pk), dump_instance(session))
+
+    def evict(self, session_key):
+        self._delete(self.get_session_cache_key(session_key))
+
+    def evict_user(self, user_id):
+        self._delete(self.get_user_cache_key(user_id))
+
+
+class SignedCookieSessionStore(BaseSessionStore):
+    """
+    Keep the whole session in a signed and compressed cookie, so only the user
+    has to be loaded. Sessions whose cookie would be longer than `max_size` are
+    kept by the `fallback` store instead.
+    """
+
+    stateless = True
+    salt = "jommerce.auth.stores.SignedCookieSessionStore"
+
+    def __init__(self, fallback=None, max_size=4000):
+        self.fallback = fallback or DatabaseSessionStore()
+        self.max_size = max_size
+
+    def encode(self, session):
+        return signing.dumps(
+            {
+                "u": session.user_id,
+                "d": session.data,
+                "e": int(session.expire_date.timestamp()),
+                "g": session.generation,
+            },
+            salt=self.salt,
+            compress=True,
+        )
+
+    def decode(self, value):
+        try:
+            payload = signing.loads(value, salt=self.salt)
+        except signing.BadSignature:
+            return None
+        return models.Session(
+            user_id=payload["u"],
+            data=payload["d"],
+            expire_date=datetime.fromtimestamp(payload["e"], tz=timezone.utc),
+            # Cookies signed before generations were added belong to the first one.
+            generation=payload.get("g", 0),
+        )
+
+    def load(self, session_key):
+        if not session_key:
+            return None
+        # Session ids never contain a colon, signed values always do.
+        if ":" not in session_key:
+            return self.fallback.load(session_key)
+        return self.decode(session_key)
+
+    def save(self, session):
+        if session.is_empty:
+            if not session._state.adding:
+                self.fallback.delete(session)
+            return None
+        session.update_generation()
+        value = self.encode(session)
+        if len(value) > self.max_size:
+            return self.fallback.save(session)
+        if not session._state.adding:
+            # The session has shrunk enough to move from the fallback store to the cookie.
+            self.fallback.delete(session)
+        return value
+
+    def delete(self, session):
+        if not session._state.adding:
+            self.fallback.delete(session)
+
+    def load_user(self, session):
+        return self.fallback.load_user(session)
+
+    async def aload(self, session_key):
+        if session_key and ":" not in session_key:
+            return await self.fallback.aload(session_key)
+        return self.load(session_key)
+
+    async def asave(self, session):
+        if session._state.adding:
+            if session.is_empty:
+                return None
+            await sync_to_async(session.update_generation)()
+            value = self.encode(session)
+            if len(value) <= self.max_size:
+                return value
+        elif session.is_unchanged and len(self.encode(session)) > self.max_size:
+            # Still kept by the fallback store, as is.
+            return await self.fallback.asave(session)
+        return await sync_to_async(self.save)(session)
+
+    async def aload_user(self, session):
+        return await self.fallback.aload_user(session)
+
+    def refresh(self, session):
+        self.fallback.refresh(session)
+
+    def evict(self, session_key):
+        self.fallback.evict(session_key)
+
+    def evict_user(self, user_id):
+        # Also drops the cached session generation checked against the cookies.
+        self.fallback.evict_user(user_id)
+
+
+database = DatabaseSessionStore()
+cached = CachedSessionStore()
+signed_cookies = SignedCookieSessionStore(fallback=database)
@@ -0,0 +1,169 @@
+import math
+import time
+import hashlib
+import functools
+import threading
+from django.core.cache import caches
+from ipware import get_client_ip
+from .conf import settings
+from .stores import LocalCache
+
+PERIODS = {"second": 1, "minute": 60, "hour": 60 * 60, "day": 60 * 60 * 24}
+
+
+def parse_rate(rate):
+    """Return the (number of requests, period in seconds) of a "10/minute" rate."""
+    number, period = rate.split("/")
+    return int(number), PERIODS[period]
+
+
+class TokenBucket:
+    """
+    Allow bursts of `capacity` requests per key, refilled at `capacity` tokens
+    per `period` seconds. Each bucket is kept as the time at which it is full
+    again (GCRA), a single integer that a Django cache updates atomically with
+    add() and incr(). Buckets are kept in an in-process cache when the Django
+    cache is unavailable.
+    """
+
+    def __init__(self, rate, cache_alias="default", key_prefix="jommerce.auth"):
+        self.capacity, self.period = parse_rate(rate)
+        self.cache_alias = cache_alias
+        self.key_prefix = key_prefix
+        # In milliseconds: the time to refill a token, and how far the bucket
+        # may be ahead of the current time before it is empty.
+        self.interval = round(self.period * 1000 / self.capacity)
+        self.tolerance = self.interval * (self.capacity - 1)
+        self.local_cache = LocalCache(max_size=10_000, timeout=self.period)
+        self._lock = threading.Lock()
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias]
+
+    def get_cache_key(self, key):
+        return f"{self.key_prefix}.throttle:{key}"
+
+    def get_timeout(self, full_at, now):
+        """Return the number of seconds until the bucket is full again."""
+        return max(1, math.ceil((full_at - now) / 1000))
+
+    def get_wait(self, full_at, now):
+        """
+        Return the number of seconds until the token that moved the bucket to
+        `full_at` is available, or 0 if it already is.
+        """
+        return max(0, full_at - self.interval - self.tolerance - now) / 1000
+
+    def take(self, full_at, now):
+        """
+        Take a token from a bucket that is full again at `full_at`. Return the
+        new `full_at` and the number of seconds to wait before a token is
+        available (0 if one was taken).
+        """
+        full_at = max(full_at or now, now) + self.interval
+        wait = self.get_wait(full_at, now)
+        if wait:
+            return full_at - self.interval, wait
+        return full_at, 0
+
+    def consume(self, key):
+        key = self.get_cache_key(key)
+        now = round(time.time() * 1000)
+        try:
+            return self._consume(key, now)
+        except Exception:
+            # The cache is down, don't turn it into an outage of the login.
+            return self._consume_locally(key, now)
+
+    def _consume(self, key, now):
+        # A new or full bucket, once a token is taken.
+        full_at = now + self.interval
+        timeout = self.get_timeout(full_at, now)
+        if self.cache.add(key, full_at, timeout):
+            return 0
+        try:
+            full_at = self.cache.incr(key, self.interval)
+        except ValueError:
+            # The bucket expired, so was full, since add().
+            self.cache.set(key, full_at, timeout)
+            return 0
+        wait = self.get_wait(full_at, now)
+        if wait:
+            # Give back the token that wasn't available.
+            self.cache.decr(key, self.interval)
+            return wait
+        self.cache.touch(key, self.get_timeout(full_at, now))
+        return 0
+
+    async def aconsume(self, key):
+        key = self.get_cache_key(key)
+        now = round(time.time() * 1000)
+        try:
+            return await self._aconsume(key, now)
+        except Exception:
+            return self._consume_locally(key, now)
+
+    async def _aconsume(self, key, now):
+        full_at = now + self.interval
+        timeout = self.get_timeout(full_at, now)
+        if await self.cache.aadd(key, full_at, timeout):
+            return 0
+        try:
+            full_at = await self.cache.aincr(key, self.interval)
+        except ValueError:
+            await self.cache.aset(key, full_at, timeout)
+            return 0
+        wait = self.get_wait(full_at, now)
+        if wait:
+            await self.cache.adecr(key, self.interval)
+            return wait
+        await self.cache.atouch(key, self.get_timeout(full_at, now))
+        return 0
+
+    def _consume_locally(self, key, now):
+        with self._lock:
+            full_at, wait = self.take(self.local_cache.get(key), now)
+            self.local_cache.set(key, full_at)
+        return wait
+
+
+@functools.lru_cache
+def get_buckets():
+    return {
+        scope: TokenBucket(rate, cache_alias=settings.AUTH_THROTTLE_CACHE)
+        for scope, rate in settings.AUTH_THROTTLE_RATES.items()
+        if rate is not None
+    }
+
+
+def get_keys(view_name, request, email=None):
+    buckets = get_buckets()
+    ip = get_client_ip(request)[0]
+    if ip and f"{view_name}_ip" in buckets:
+        yield buckets[f"{view_name}_ip"], f"{view_name}_ip:{ip}"
+    if email and f"{view_name}_email" in buckets:
+        # Hashed to keep the key short and free of characters caches reject.
+        digest = hashlib.sha256(email.strip().lower().encode()).hexdigest()
+        yield buckets[f"{view_name}_email"], f"{view_name}_email:{digest}"
+
+
+def throttle(view_name, request, email=None):
+    """
+    Take a token from the "<view_name>_ip" and "<view_name>_email" buckets of
+    AUTH_THROTTLE_RATES. Return the number of seconds the client must wait,
+    or 0 if the request is allowed.
+    """
+    for bucket, key in get_keys(view_name, request, email):
+        wait = bucket.consume(key)
+        if wait:
+            return wait
+    return 0
+
+
+async def athrottle(view_name, request, email=None):
+    for bucket, key in get_keys(view_name, request, email):
+        wait = await bucket.aconsume(key)
+        if wait:
+            return wait
+    return 0
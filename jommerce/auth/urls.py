@@ -1,4 +1,5 @@
 from django.urls import path
+from . import api
 from .views import login, logout, signup
 
 app_name = "auth"
@@ -7,4 +8,8 @@ urlpatterns = [
     path("login/", login, name="login"),
     path("logout/", logout, name="logout"),
     path("signup/", signup, name="signup"),
+    path("api/login/", api.login, name="api_login"),
+    path("api/logout/", api.logout, name="api_logout"),
+    path("api/signup/", api.signup, name="api_signup"),
+    path("api/me/", api.me, name="api_me"),
 ]
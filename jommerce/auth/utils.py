@@ -1,5 +1,94 @@
+import os
 import string
 import secrets
+import functools
+import threading
+
+
+class RandomBuffer:
+    """
+    Hand out random bytes from blocks of `size` bytes of `secrets.token_bytes`,
+    so that many small reads make a single call to the OS random generator.
+    """
+
+    def __init__(self, size=4096):
+        self.size = size
+        self.__lock = threading.Lock()
+        self.__pid = None
+        self.__buffer = b""
+        self.__offset = 0
+
+    def read(self, n):
+        with self.__lock:
+            if self.__pid != os.getpid():
+                # A forked child must never hand out the bytes of its parent.
+                self.__pid = os.getpid()
+                self.__buffer, self.__offset = b"", 0
+            if self.__offset + n > len(self.__buffer):
+                self.__buffer = self.__buffer[self.__offset :] + secrets.token_bytes(
+                    max(self.size, n)
+                )
+                self.__offset = 0
+            start = self.__offset
+            self.__offset += n
+            return self.__buffer[start : self.__offset]
+
+    def randbelow(self, n):
+        """Return a random int in [0, n), without modulo bias."""
+        bits = (n - 1).bit_length()
+        while True:
+            value = int.from_bytes(self.read((bits + 7) // 8), "big")
+            value &= (1 << bits) - 1
+            if value < n:
+                return value
+
+    def sample(self, n, k):
+        """Return `k` distinct random ints in [0, n), with a partial Fisher-Yates."""
+        population = list(range(n))
+        for i in range(k):
+            j = i + self.randbelow(n - i)
+            population[i], population[j] = population[j], population[i]
+        return population[:k]
+
+
+random_buffer = RandomBuffer()
+
+
+class RandomStringGenerator:
+    """
+    Generate strings of characters drawn uniformly from `alphabet`, an ASCII
+    string of at most 256 characters. Random bytes are mapped to characters in
+    bulk with `bytes.translate`, and the bytes that would bias the modulo are
+    dropped (rejection sampling).
+    """
+
+    def __init__(self, alphabet, buffer=random_buffer):
+        if not 0 < len(alphabet) <= 256:
+            raise ValueError("The alphabet must have between 1 and 256 characters.")
+        self.alphabet = alphabet
+        self.buffer = buffer
+        characters = alphabet.encode("ascii")
+        self.__limit = 256 - 256 % len(characters)
+        self.__table = bytes(characters[i % len(characters)] for i in range(256))
+        self.__rejected = bytes(range(self.__limit, 256))
+
+    def generate(self, length):
+        result = b""
+        while len(result) < length:
+            needed = length - len(result)
+            block = self.buffer.read(needed * 256 // self.__limit + 1)
+            result += block.translate(self.__table, self.__rejected)
+        return result[:length].decode("ascii")
+
+    def generate_many(self, count, length):
+        """Return `count` strings of `length` characters, generated at once."""
+        chars = self.generate(count * length)
+        return [chars[i : i + length] for i in range(0, count * length, length)]
+
+
+@functools.lru_cache
+def get_generator(alphabet):
+    return RandomStringGenerator(alphabet)
 
 
 def generate_random_string(
@@ -12,29 +101,23 @@ def generate_random_string(
             "At least one of these arguments must be True. {lowercase, uppercase, digit, symbol}"
         )
 
-    values = set()
-    characters = ""
+    classes = []
     if lowercase:
-        values.add(secrets.choice(string.ascii_lowercase))
-        characters += string.ascii_lowercase
+        classes.append(string.ascii_lowercase)
     if uppercase:
-        values.add(secrets.choice(string.ascii_uppercase))
-        characters += string.ascii_uppercase
+        classes.append(string.ascii_uppercase)
     if digit:
-        values.add(secrets.choice(string.digits))
-        characters += string.digits
+        classes.append(string.digits)
     if symbol:
-        values.add(secrets.choice(string.punctuation))
-        characters += string.punctuation
+        classes.append(string.punctuation)
 
-    try:
-        indexes = secrets.SystemRandom().sample(range(length), len(values))
-    except ValueError:
+    if length < len(classes):
         raise ValueError(
-            f"With the given arguments, the `length` value must be at least {len(values)}"
+            f"With the given arguments, the `length` value must be at least {len(classes)}"
         )
 
-    s = [secrets.choice(characters) for _ in range(length)]
-    for index, value in zip(indexes, values):
-        s[index] = value
+    s = list(get_generator("".join(classes)).generate(length))
+    # Overwrite random positions with one character of each class.
+    for index, characters in zip(random_buffer.sample(length, len(classes)), classes):
+        s[index] = get_generator(characters).generate(1)
     return "".join(s)
@@ -1,4 +1,10 @@
-from django.core.exceptions import ValidationError
+import mmap
+import struct
+import string
+import hashlib
+import functools
+import threading
+from django.core.exceptions import ImproperlyConfigured, ValidationError
 from django.utils.deconstruct import deconstructible
 from django.utils.module_loading import import_string
 from django.utils.translation import gettext_lazy as _
@@ -13,6 +19,98 @@ def get_password_validators():
     return [import_string(validator) for validator in settings.AUTH_PASSWORD_VALIDATORS]
 
 
+@functools.lru_cache
+def get_password_policy():
+    return PasswordPolicy(get_password_validators())
+
+
+def validate_password(password):
+    """Validate `password` against the policy of AUTH_PASSWORD_VALIDATORS."""
+    get_password_policy()(password)
+
+
+SYMBOLS = frozenset(string.punctuation)
+
+
+def classify(char):
+    """Return the character class of `char`, or None."""
+    if char.isdigit():
+        return "digit"
+    elif char.islower():
+        return "lowercase"
+    elif char.isupper():
+        return "uppercase"
+    elif char in SYMBOLS:
+        return "symbol"
+    return None
+
+
+class PasswordPolicy:
+    """
+    Run a list of password validators and report all their errors at once.
+    The character classes required by CharacterClassValidators are checked
+    together, in a single pass over the distinct characters of the password.
+    """
+
+    def __init__(self, validators):
+        self.validators = validators
+        self.required_classes = {
+            validator.character_class
+            for validator in validators
+            if isinstance(validator, CharacterClassValidator)
+        }
+
+    def get_errors(self, password):
+        """Return the list of ValidationErrors of `password`, empty if it is valid."""
+        missing = set()
+        if self.required_classes:
+            missing = self.required_classes - set(map(classify, set(password)))
+        errors = []
+        for validator in self.validators:
+            if isinstance(validator, CharacterClassValidator):
+                if validator.character_class in missing:
+                    errors.append(validator.get_error())
+                continue
+            try:
+                validator(password)
+            except ValidationError as error:
+                errors.append(error)
+        return errors
+
+    def __call__(self, password):
+        errors = self.get_errors(password)
+        if errors:
+            raise ValidationError(errors)
+
+
+@deconstructible
+class CharacterClassValidator:
+    """
+    Require at least one character of `character_class`: "digit",
+    "lowercase", "uppercase" or "symbol".
+    """
+
+    def __init__(self, character_class, message, code):
+        self.character_class = character_class
+        self.message = message
+        self.code = code
+
+    def get_error(self):
+        return ValidationError(self.message, code=self.code)
+
+    def __call__(self, password):
+        if self.character_class not in map(classify, password):
+            raise self.get_error()
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, self.__class__)
+            and self.character_class == other.character_class
+            and self.message == other.message
+            and self.code == other.code
+        )
+
+
 @deconstructible
 class UsernameLengthValidator:
     def __init__(self, min_length=5, max_length=32):
@@ -109,3 +207,75 @@ class PasswordLengthValidator:
             and self.min_length == other.min_length
             and self.max_length == other.max_length
         )
+
+
+# Header of the files built by the buildbreachedpasswords command: a magic
+# string and the width of the records. The records, truncated SHA-1 hashes of
+# the passwords, follow in ascending order.
+BREACHED_PASSWORDS_HEADER = struct.Struct(">4sB3x")
+BREACHED_PASSWORDS_MAGIC = b"JBPW"
+
+
+def get_breached_password_hash(password, width):
+    """Return the first `width` bytes of the SHA-1 of `password` (str or bytes)."""
+    if isinstance(password, str):
+        password = password.encode()
+    return hashlib.sha1(password).digest()[:width]
+
+
+@deconstructible
+class BreachedPasswordValidator:
+    """
+    Reject the passwords of a file built by the buildbreachedpasswords command
+    (AUTH_BREACHED_PASSWORDS_PATH by default). The file is memory-mapped, so
+    every worker process shares the same pages, and searched by bisection.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.__lock = threading.Lock()
+        self.__records = None
+
+    def open(self):
+        with self.__lock:
+            if self.__records is None:
+                path = self.path or settings.AUTH_BREACHED_PASSWORDS_PATH
+                if path is None:
+                    raise ImproperlyConfigured(
+                        "Set AUTH_BREACHED_PASSWORDS_PATH to the file built by the "
+                        "buildbreachedpasswords command."
+                    )
+                with open(path, "rb") as file:
+                    records = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+                magic, width = BREACHED_PASSWORDS_HEADER.unpack_from(records)
+                if magic != BREACHED_PASSWORDS_MAGIC:
+                    raise ImproperlyConfigured(
+                        f"{path} isn't a breached passwords file."
+                    )
+                self.__records, self.__width = records, width
+        return self.__records, self.__width
+
+    def is_breached(self, password):
+        records, width = self.open()
+        target = get_breached_password_hash(password, width)
+        offset = BREACHED_PASSWORDS_HEADER.size
+        low, high = 0, (len(records) - offset) // width
+        while low < high:
+            middle = (low + high) // 2
+            start = offset + middle * width
+            if records[start : start + width] < target:
+                low = middle + 1
+            else:
+                high = middle
+        start = offset + low * width
+        return records[start : start + width] == target
+
+    def __call__(self, password):
+        if self.is_breached(password):
+            raise ValidationError(
+                _("This password has appeared in a data breach."),
+                code="password_breached",
+            )
+
+    def __eq__(self, other):
+        return isinstance(other, self.__class__) and self.path == other.path
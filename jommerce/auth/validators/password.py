@@ -1,39 +1,22 @@
-from django.core.exceptions import ValidationError
 from django.utils.translation import gettext_lazy as _
-from jommerce.auth.validators import PasswordLengthValidator
-
-
-def number(password):
-    if not any(map(str.isdigit, password)):
-        raise ValidationError(
-            _("at least one number"),
-            code="password_no_number",
-        )
-
-
-def lowercase(password):
-    if not any(map(str.islower, password)):
-        raise ValidationError(
-            _("at least one lowercase letter"),
-            code="password_no_lowercase",
-        )
-
-
-def uppercase(password):
-    if not any(map(str.isupper, password)):
-        raise ValidationError(
-            _("at least one uppercase letter"),
-            code="password_no_uppercase",
-        )
-
-
-def symbol(password):
-    special_characters = "!\"#$%&'()*+,-./:;<=>?@[\\]^_`{|}~"
-    if not any(char in special_characters for char in password):
-        raise ValidationError(
-            _("at least one special character"),
-            code="password_no_symbol",
-        )
-
-
+from jommerce.auth.validators import (
+    PasswordLengthValidator,
+    CharacterClassValidator,
+    BreachedPasswordValidator,
+)
+
+
+number = CharacterClassValidator(
+    "digit", _("at least one number"), code="password_no_number"
+)
+lowercase = CharacterClassValidator(
+    "lowercase", _("at least one lowercase letter"), code="password_no_lowercase"
+)
+uppercase = CharacterClassValidator(
+    "uppercase", _("at least one uppercase letter"), code="password_no_uppercase"
+)
+symbol = CharacterClassValidator(
+    "symbol", _("at least one special character"), code="password_no_symbol"
+)
 length = PasswordLengthValidator()
+breached = BreachedPasswordValidator()
@@ -1,25 +1,62 @@
+import math
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
 from django.shortcuts import render, redirect
 from django.utils.translation import gettext_lazy as _
 from .conf import settings
 from .forms import LoginForm, SignupForm
+from .hashers import HasherOverloaded
 from .models import User
+from .throttling import athrottle
 
 
-def login(request):
+def retry_later(status, retry_after):
+    response = HttpResponse(
+        _("Too many requests, please try again later."), status=status
+    )
+    response["Retry-After"] = str(max(1, math.ceil(retry_after)))
+    return response
+
+
+def service_unavailable():
+    """Tell the client to retry when passwords can't be hashed fast enough."""
+    return retry_later(503, settings.AUTH_PASSWORD_HASHER_QUEUE_TIMEOUT or 1)
+
+
+async def get_user(request):
+    if hasattr(request, "auser"):
+        return await request.auser()
+    return getattr(request, "user", None)
+
+
+async def login(request):
     form = LoginForm(request.POST or None)
-    if hasattr(request, "user") and request.user.is_authenticated:
+    user = await get_user(request)
+    if user is not None and user.is_authenticated:
         return redirect(settings.AUTH_LOGIN_REDIRECT_URL)
     if request.method == "POST":
+        # Reject floods before querying the database or hashing anything.
+        wait = await athrottle("login", request, request.POST.get("email"))
+        if wait:
+            return retry_later(429, wait)
         try:
-            user = User.objects.get(email=request.POST["email"])
+            user = await User.objects.aget(email=request.POST["email"])
         except User.DoesNotExist:
-            form.add_error("email", _("This email does not exist."))
+            # Validating a ModelForm queries the database.
+            await sync_to_async(form.add_error)(
+                "email", _("This email does not exist.")
+            )
         else:
-            if user.verify_password(request.POST["password"]):
+            try:
+                verified = await user.averify_password(request.POST["password"])
+            except HasherOverloaded:
+                return service_unavailable()
+            if verified:
+                await request.session.acycle_key()
                 request.session.user = user
                 return redirect(settings.AUTH_LOGIN_REDIRECT_URL)
             else:
-                form.add_error("password", _("Incorrect password"))
+                await sync_to_async(form.add_error)("password", _("Incorrect password"))
     return render(request, "auth/login.html", context={"form": form})
 
 
@@ -35,18 +72,26 @@ def logout(request):
     return render(request, "auth/logout.html")
 
 
-def signup(request):
+async def signup(request):
     form = SignupForm(request.POST or None)
-    if hasattr(request, "user") and request.user.is_authenticated:
+    user = await get_user(request)
+    if user is not None and user.is_authenticated:
         return redirect(settings.AUTH_SIGNUP_REDIRECT_URL)
     if request.method == "POST":
+        wait = await athrottle("signup", request, request.POST.get("email"))
+        if wait:
+            return retry_later(429, wait)
         try:
-            User.objects.get(email=request.POST["email"])
+            await User.objects.aget(email=request.POST["email"])
         except User.DoesNotExist:
-            User.objects.create(
-                email=request.POST["email"], password=request.POST["password"]
-            )
+            user = User(email=request.POST["email"], password=request.POST["password"])
+            try:
+                await user.asave(force_insert=True)
+            except HasherOverloaded:
+                return service_unavailable()
             return redirect(settings.AUTH_SIGNUP_REDIRECT_URL)
         else:
-            form.add_error("email", _("This email already exists."))
+            await sync_to_async(form.add_error)(
+                "email", _("This email already exists.")
+            )
     return render(request, "auth/signup.html", context={"form": form})
@@ -16,3 +16,14 @@ INSTALLED_APPS += [
 # Authentication
 # ----------------------------------------------------------------------------------------------------------------------
 AUTH_PASSWORD_HASHERS = ("tests.auth.test_hashers.pbkdf2_hasher",)
+AUTH_PASSWORD_REHASH_IN_BACKGROUND = False
+AUTH_THROTTLE_RATES = {}
+
+
+# Databases
+# ----------------------------------------------------------------------------------------------------------------------
+# Only used by the tests of jommerce.auth.routers.SessionRouter.
+DATABASES["sessions"] = {
+    "ENGINE": "django.db.backends.sqlite3",
+    "NAME": BASE_DIR / "sessions.sqlite3",
+}
@@ -0,0 +1,161 @@
+from unittest import mock
+from django.conf import settings as django_settings
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from jommerce.auth.conf import settings
+from jommerce.auth.hashers import HasherOverloaded
+from jommerce.auth.models import User, Session
+
+
+@override_settings(
+    ROOT_URLCONF="jommerce.auth.urls",
+    MIDDLEWARE=["jommerce.auth.middleware.AuthenticationMiddleware"],
+)
+class ApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(email="test@example.com", password="123456")
+
+    def post(self, path, data):
+        return self.client.post(path, data=data, content_type="application/json")
+
+    def login(self):
+        return self.post(
+            "/api/login/", {"email": "test@example.com", "password": "123456"}
+        )
+
+    def test_login(self):
+        response = self.login()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json(),
+            {"user": {"id": self.user.pk, "email": "test@example.com", "status": 0}},
+        )
+        session_key = response.cookies[settings.AUTH_SESSION_COOKIE_NAME].value
+        self.assertEqual(Session.objects.get(pk=session_key).user, self.user)
+
+    def test_login_with_a_new_session_id(self):
+        Session.objects.create(id="anonymous_session", data={"cart": [1]})
+        self.client.cookies[settings.AUTH_SESSION_COOKIE_NAME] = "anonymous_session"
+        response = self.login()
+        session_key = response.cookies[settings.AUTH_SESSION_COOKIE_NAME].value
+        self.assertNotEqual(session_key, "anonymous_session")
+        self.assertEqual(Session.objects.get(pk=session_key).user, self.user)
+        self.assertFalse(Session.objects.filter(pk="anonymous_session").exists())
+
+    def test_login_with_invalid_credentials(self):
+        for data in (
+            {"email": "test@example.com", "password": "111111"},
+            {"email": "fake@example.com", "password": "123456"},
+        ):
+            response = self.post("/api/login/", data)
+            self.assertEqual(response.status_code, 401)
+            self.assertEqual(response.json(), {"error": "invalid_credentials"})
+
+    def test_hash_the_password_of_unknown_emails(self):
+        hasher = mock.Mock(ahash=mock.AsyncMock())
+        with mock.patch("jommerce.auth.api.get_hashers", return_value=[hasher]):
+            response = self.post(
+                "/api/login/", {"email": "fake@example.com", "password": "123456"}
+            )
+        self.assertEqual(response.status_code, 401)
+        hasher.ahash.assert_awaited_once_with("123456")
+
+    def test_login_with_an_invalid_body(self):
+        response = self.client.post(
+            "/api/login/", data="[", content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 400)
+        for data in (
+            {"password": "123456"},
+            {"email": "test@example.com"},
+            {"email": "test@example.com", "password": 123456},
+            {"email": "test@example.com", "password": ["123456"]},
+        ):
+            response = self.post("/api/login/", data)
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json(), {"error": "invalid_request"})
+        self.assertEqual(self.client.get("/api/login/").status_code, 405)
+
+    @override_settings(AUTH_THROTTLE_RATES={"login_email": "1/minute"})
+    def test_login_throttled(self):
+        cache.clear()
+        self.login()
+        response = self.login()
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response["Retry-After"], "60")
+        self.assertEqual(response.json(), {"error": "throttled"})
+
+    def test_login_overloaded(self):
+        with mock.patch.object(User, "averify_password", side_effect=HasherOverloaded):
+            response = self.login()
+        self.assertEqual(response.status_code, 503)
+        self.assertIn("Retry-After", response)
+
+    def test_me(self):
+        response = self.client.get("/api/me/")
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json(), {"error": "not_authenticated"})
+        self.login()
+        response = self.client.get("/api/me/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["user"]["email"], "test@example.com")
+
+    def test_logout(self):
+        self.login()
+        response = self.client.post("/api/logout/")
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.client.get("/api/me/").status_code, 401)
+
+    def test_signup(self):
+        response = self.post(
+            "/api/signup/", {"email": "new@example.com", "password": "123456"}
+        )
+        self.assertEqual(response.status_code, 201)
+        user = User.objects.get(email="new@example.com")
+        self.assertEqual(response.json()["user"]["id"], user.pk)
+        self.assertIs(user.verify_password("123456"), True)
+
+    def test_signup_with_invalid_fields(self):
+        response = self.post(
+            "/api/signup/", {"email": "test@example.com", "password": ""}
+        )
+        self.assertEqual(response.status_code, 400)
+        data = response.json()
+        self.assertEqual(data["error"], "invalid_fields")
+        self.assertEqual(set(data["fields"]), {"email", "password"})
+        self.assertEqual(data["fields"]["password"][0]["code"], "required")
+
+
+@override_settings(
+    ROOT_URLCONF="jommerce.auth.urls",
+    MIDDLEWARE=[
+        "django.middleware.csrf.CsrfViewMiddleware",
+        "jommerce.auth.middleware.AuthenticationMiddleware",
+    ],
+)
+class ApiCsrfTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(email="test@example.com", password="123456")
+
+    def setUp(self):
+        self.client = Client(enforce_csrf_checks=True)
+
+    def login(self, **headers):
+        return self.client.post(
+            "/api/login/",
+            {"email": "test@example.com", "password": "123456"},
+            content_type="application/json",
+            **headers,
+        )
+
+    def test_reject_requests_without_the_token(self):
+        self.assertEqual(self.login().status_code, 403)
+
+    def test_get_the_token_from_me(self):
+        response = self.client.get("/api/me/")
+        self.assertEqual(response.status_code, 401)
+        token = response.cookies[django_settings.CSRF_COOKIE_NAME].value
+        response = self.login(HTTP_X_CSRFTOKEN=token)
+        self.assertEqual(response.status_code, 200)
@@ -0,0 +1,248 @@
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+from django.core.management import call_command, CommandError
+from django.test import TestCase, SimpleTestCase, override_settings
+from django.utils import timezone
+from jommerce.auth.hashers import PBKDF2PasswordHasher, ScryptPasswordHasher
+from jommerce.auth.models import Session, User
+from jommerce.auth.validators import BreachedPasswordValidator
+from tests.auth.test_hashers import pbkdf2_hasher
+
+
+class ClearSessionsCommandTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        expired = timezone.now() - timezone.timedelta(days=1)
+        for i in range(5):
+            Session.objects.create(
+                id=f"expired_{i}", data={"key": "value"}, expire_date=expired
+            )
+        Session.objects.create(id="active", data={"key": "value"})
+
+    def test_delete_expired_sessions(self):
+        out = StringIO()
+        call_command("clearsessions", stdout=out)
+        self.assertEqual(list(Session.objects.values_list("pk", flat=True)), ["active"])
+        self.assertIn("Deleted 5 expired sessions.", out.getvalue())
+
+    @mock.patch("jommerce.auth.management.commands.clearsessions.time.sleep")
+    def test_delete_in_batches(self, sleep):
+        with self.assertNumQueries(6):
+            call_command("clearsessions", batch_size=2, sleep=0.5, stdout=StringIO())
+        self.assertEqual(Session.objects.count(), 1)
+        self.assertEqual(sleep.call_args_list, [mock.call(0.5), mock.call(0.5)])
+
+    def test_no_expired_sessions(self):
+        Session.objects.filter(pk__startswith="expired").delete()
+        out = StringIO()
+        call_command("clearsessions", stdout=out)
+        self.assertIn("Deleted 0 expired sessions.", out.getvalue())
+        self.assertEqual(Session.objects.count(), 1)
+
+
+class CalibrateHashersCommandTests(SimpleTestCase):
+    def test_recommend_parameters(self):
+        out = StringIO()
+        call_command(
+            "calibratehashers",
+            hasher=["pbkdf2", "scrypt"],
+            target_ms=5,
+            memory_mib=4,
+            concurrency=2,
+            stdout=out,
+        )
+        output = out.getvalue()
+        self.assertIn(
+            "Target: 5 ms per hash, 2 MiB per hash (2 concurrent hashes).", output
+        )
+        self.assertIn("pbkdf2_sha256: iterations=", output)
+        self.assertIn("scrypt: work_factor=", output)
+        self.assertIn("logins per second per core", output)
+
+    def test_emit_settings(self):
+        out = StringIO()
+        call_command(
+            "calibratehashers",
+            hasher=["pbkdf2", "scrypt"],
+            target_ms=5,
+            memory_mib=2,
+            concurrency=1,
+            emit_settings=True,
+            stdout=out,
+        )
+        namespace = {}
+        exec(out.getvalue(), namespace)
+        self.assertIsInstance(namespace["pbkdf2"], PBKDF2PasswordHasher)
+        self.assertIsInstance(namespace["scrypt"], ScryptPasswordHasher)
+        # The work factor fits the memory budget.
+        self.assertLessEqual(128 * namespace["scrypt"].work_factor * 8, 2 * 1024 * 1024)
+        self.assertTrue(
+            namespace["scrypt"].verify("password", namespace["scrypt"].hash("password"))
+        )
+
+
+class ImportUsersCommandTests(TestCase):
+    def write(self, suffix, content):
+        fd, path = tempfile.mkstemp(suffix=suffix)
+        with os.fdopen(fd, "w") as file:
+            file.write(content)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def test_import_csv(self):
+        password_hash = pbkdf2_hasher.hash("hashed")
+        path = self.write(
+            ".csv",
+            "email,password,password_hash,status\n"
+            "a@example.com,123456,,1\n"
+            f"b@example.com,,{password_hash},0\n",
+        )
+        out = StringIO()
+        call_command("importusers", path, processes=1, stdout=out)
+        self.assertIn("Processed 2 users in", out.getvalue())
+        self.assertIs(User.objects.get(email="a@example.com").status, 1)
+        self.assertEqual(
+            User.objects.get(email="b@example.com").password, password_hash
+        )
+        self.assertIs(
+            User.objects.get(email="a@example.com").verify_password("123456"), True
+        )
+
+    def test_import_jsonl(self):
+        path = self.write(
+            ".jsonl",
+            '{"email": "a@example.com", "password": "123456"}\n\n'
+            '{"email": "b@example.com", "password": "654321"}\n',
+        )
+        out = StringIO()
+        call_command(
+            "importusers", path, processes=1, batch_size=1, verbosity=2, stdout=out
+        )
+        self.assertIn("Processed 1 users so far", out.getvalue())
+        self.assertEqual(User.objects.count(), 2)
+
+    def test_ignore_conflicts(self):
+        User.objects.create(email="a@example.com", password="123456")
+        path = self.write(".jsonl", '{"email": "a@example.com", "password": "1"}\n')
+        out = StringIO()
+        call_command(
+            "importusers", path, processes=1, ignore_conflicts=True, stdout=out
+        )
+        self.assertIn("0 created, 1 skipped", out.getvalue())
+        self.assertIs(User.objects.get().verify_password("123456"), True)
+
+    @override_settings(
+        AUTH_PASSWORD_VALIDATORS=[
+            "jommerce.auth.validators.password.number",
+            "jommerce.auth.validators.password.symbol",
+        ]
+    )
+    def test_validate_passwords(self):
+        path = self.write(".jsonl", '{"email": "a@example.com", "password": "abc"}\n')
+        with self.assertRaisesMessage(
+            CommandError,
+            "Row 1: at least one number at least one special character",
+        ):
+            call_command("importusers", path, processes=1, validate_passwords=True)
+        self.assertFalse(User.objects.exists())
+
+    def test_report_the_users_imported_before_an_invalid_row(self):
+        path = self.write(
+            ".jsonl",
+            '{"email": "a@example.com", "password": "1"}\n'
+            '{"email": "b@example.com", "password": "1"}\n'
+            '{"email": "c@example.com"}\n',
+        )
+        with self.assertRaisesMessage(
+            CommandError, "The 1 users processed before were imported"
+        ):
+            call_command("importusers", path, processes=1, batch_size=1)
+        self.assertEqual(User.objects.get().email, "a@example.com")
+
+    def test_atomic(self):
+        path = self.write(
+            ".jsonl",
+            '{"email": "a@example.com", "password": "1"}\n{"email": "b@example.com"}\n',
+        )
+        with self.assertRaisesMessage(CommandError, "No users were imported."):
+            call_command("importusers", path, processes=1, batch_size=1, atomic=True)
+        self.assertFalse(User.objects.exists())
+
+    def test_invalid_rows(self):
+        path = self.write(".jsonl", '{"email": "a@example.com"}\n')
+        with self.assertRaisesMessage(CommandError, "Row 1: expected either"):
+            call_command("importusers", path, processes=1)
+        path = self.write(".txt", "")
+        with self.assertRaisesMessage(CommandError, "Unknown format"):
+            call_command("importusers", path)
+
+
+class BuildBreachedPasswordsCommandTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.output = os.path.join(self.directory, "breached.bin")
+
+    def write(self, content):
+        path = os.path.join(self.directory, "input.txt")
+        with open(path, "w") as file:
+            file.write(content)
+        return path
+
+    def test_sort_and_deduplicate_in_chunks(self):
+        path = self.write("zebra\napple\n\nmango\napple\nzebra\n")
+        out = StringIO()
+        call_command(
+            "buildbreachedpasswords", path, self.output, chunk_size=2, stdout=out
+        )
+        self.assertIn("Wrote 3 password hashes", out.getvalue())
+        self.assertEqual(os.path.getsize(self.output), 8 + 3 * 8)
+        with open(self.output, "rb") as file:
+            file.seek(8)
+            records = [file.read(8) for _ in range(3)]
+        self.assertEqual(records, sorted(records))
+        validator = BreachedPasswordValidator(self.output)
+        self.assertIs(validator.is_breached("mango"), True)
+        self.assertIs(validator.is_breached("kiwi"), False)
+
+    def test_read_sha1_hashes(self):
+        # SHA-1 of "password".
+        path = self.write("5BAA61E4C9B93F3F0682250B6CF8331B7EE68FD8:3861493\n")
+        call_command(
+            "buildbreachedpasswords",
+            path,
+            self.output,
+            sha1=True,
+            width=6,
+            stdout=StringIO(),
+        )
+        self.assertIs(
+            BreachedPasswordValidator(self.output).is_breached("password"), True
+        )
+
+    def test_hash_the_bytes_of_each_line(self):
+        path = os.path.join(self.directory, "input.txt")
+        with open(path, "wb") as file:
+            file.write("café\n".encode() + b"caf\xe9\ncaf\xe8\n")
+        out = StringIO()
+        call_command("buildbreachedpasswords", path, self.output, stdout=out)
+        self.assertIn("Wrote 3 password hashes", out.getvalue())
+        self.assertIs(BreachedPasswordValidator(self.output).is_breached("café"), True)
+
+    def test_invalid_sha1_hashes(self):
+        for line in ("password", "5BAA61E4:1"):
+            path = self.write(f"{line}\n")
+            with self.assertRaisesMessage(
+                CommandError, "Line 1: not a SHA-1 hash in hex."
+            ):
+                call_command("buildbreachedpasswords", path, self.output, sha1=True)
+        self.assertFalse(os.path.exists(self.output))
+
+    def test_invalid_width(self):
+        path = self.write("password\n")
+        for width in (0, 21):
+            with self.assertRaisesMessage(CommandError, "--width must be between 1"):
+                call_command("buildbreachedpasswords", path, self.output, width=width)
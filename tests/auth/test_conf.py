@@ -0,0 +1,47 @@
+import dataclasses
+from django.test import SimpleTestCase, override_settings
+from jommerce.auth import settings as app_settings
+from jommerce.auth.conf import settings
+from jommerce.auth.stores import cached, get_session_store
+from jommerce.auth.validators import get_password_policy
+
+
+class SettingsTests(SimpleTestCase):
+    def test_fall_back_to_the_app_settings(self):
+        self.assertEqual(
+            settings.AUTH_SESSION_COOKIE_NAME, app_settings.AUTH_SESSION_COOKIE_NAME
+        )
+        with override_settings(AUTH_SESSION_COOKIE_NAME="custom"):
+            self.assertEqual(settings.AUTH_SESSION_COOKIE_NAME, "custom")
+        self.assertEqual(
+            settings.AUTH_SESSION_COOKIE_NAME, app_settings.AUTH_SESSION_COOKIE_NAME
+        )
+
+    def test_cache_resolved_values(self):
+        settings.AUTH_SESSION_COOKIE_PATH
+        self.assertIn("AUTH_SESSION_COOKIE_PATH", vars(settings))
+        with override_settings(AUTH_SESSION_COOKIE_PATH="/shop/"):
+            self.assertNotIn("AUTH_SESSION_COOKIE_PATH", vars(settings))
+            self.assertEqual(settings.AUTH_SESSION_COOKIE_PATH, "/shop/")
+
+    def test_unknown_setting(self):
+        with self.assertRaises(AttributeError):
+            settings.AUTH_UNKNOWN_SETTING
+
+    def test_session_cookie(self):
+        cookie = settings.session_cookie
+        self.assertIs(settings.session_cookie, cookie)
+        self.assertEqual(cookie.name, app_settings.AUTH_SESSION_COOKIE_NAME)
+        with self.assertRaises(dataclasses.FrozenInstanceError):
+            cookie.name = "custom"
+        with override_settings(AUTH_SESSION_COOKIE_SECURE=True):
+            self.assertIs(settings.session_cookie.secure, True)
+        self.assertIs(settings.session_cookie.secure, False)
+
+    def test_clear_objects_built_from_settings(self):
+        policy = get_password_policy()
+        with override_settings(AUTH_PASSWORD_VALIDATORS=[]):
+            self.assertIsNot(get_password_policy(), policy)
+        with override_settings(AUTH_SESSION_STORE="jommerce.auth.stores.cached"):
+            self.assertIs(get_session_store(), cached)
+        self.assertIsNot(get_session_store(), cached)
@@ -0,0 +1,52 @@
+from django.db import connection
+from django.test import TestCase, override_settings
+from jommerce.auth.fields import encode, decode
+from jommerce.auth.models import Session
+
+
+class SessionDataCodecTests(TestCase):
+    def test_round_trip(self):
+        data = {"key": "value", "cart": [1, 2, 3], "name": "جامرس"}
+        self.assertEqual(decode(encode(data)), data)
+
+    def test_compact_encoding(self):
+        self.assertEqual(encode({"key": [1, 2]}), b'j{"key":[1,2]}')
+
+    @override_settings(AUTH_SESSION_DATA_COMPRESS_MIN_LENGTH=100)
+    def test_compress_large_data(self):
+        data = {"cart": ["product"] * 100}
+        value = encode(data)
+        self.assertTrue(value.startswith(b"z"))
+        self.assertLess(len(value), 100)
+        self.assertEqual(decode(value), data)
+        self.assertTrue(encode({"key": "value"}).startswith(b"j"))
+
+    @override_settings(AUTH_SESSION_DATA_COMPRESS_MIN_LENGTH=None)
+    def test_disable_compression(self):
+        self.assertTrue(encode({"cart": ["product"] * 1000}).startswith(b"j"))
+
+    def test_decode_memoryview(self):
+        self.assertEqual(decode(memoryview(b'j{"key":"value"}')), {"key": "value"})
+
+    def test_unknown_codec(self):
+        with self.assertRaisesMessage(ValueError, "Unknown session data codec"):
+            decode(b"x{}")
+
+
+class SessionDataFieldTests(TestCase):
+    @override_settings(AUTH_SESSION_DATA_COMPRESS_MIN_LENGTH=100)
+    def test_save_and_load(self):
+        data = {"cart": ["product"] * 100}
+        Session.objects.create(id="session", data=data)
+        self.assertEqual(Session.objects.get(pk="session").data, data)
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT data FROM auth_session WHERE id = 'session'")
+            self.assertTrue(bytes(cursor.fetchone()[0]).startswith(b"z"))
+
+    def test_update_data(self):
+        session = Session.objects.create(id="session", data={"key": "value"})
+        session["key"] = "changed value"
+        session.save()
+        self.assertEqual(
+            Session.objects.get(pk="session").data, {"key": "changed value"}
+        )
@@ -1,5 +1,8 @@
+import time
 import unittest
-from django.test import TestCase
+import threading
+from unittest import mock
+from django.test import TestCase, SimpleTestCase, override_settings
 from jommerce.auth.utils import generate_random_string
 from jommerce.auth.hashers import (
     BasePasswordHasher,
@@ -7,6 +10,12 @@ from jommerce.auth.hashers import (
     Argon2PasswordHasher,
     BcryptPasswordHasher,
     ScryptPasswordHasher,
+    HasherOverloaded,
+    MemoryLimiter,
+    check_password,
+    get_executor,
+    get_limiter,
+    identify_hasher,
 )
 
 try:
@@ -25,6 +34,108 @@ argon2_hasher = Argon2PasswordHasher(memory_cost=8, time_cost=1, parallelism=1)
 bcrypt_hasher = BcryptPasswordHasher(rounds=4)
 
 
+class ExecutorTests(SimpleTestCase):
+    @override_settings(AUTH_PASSWORD_HASHER_MAX_WORKERS=2)
+    def test_max_workers(self):
+        self.assertEqual(get_executor()._max_workers, 2)
+
+
+@override_settings(
+    AUTH_PASSWORD_HASHERS=[
+        "tests.auth.test_hashers.scrypt_hasher",
+        "tests.auth.test_hashers.pbkdf2_hasher",
+    ]
+)
+class CheckPasswordTests(SimpleTestCase):
+    def test_identify_hasher(self):
+        self.assertIs(identify_hasher(pbkdf2_hasher.hash("password")), pbkdf2_hasher)
+        self.assertIs(identify_hasher(scrypt_hasher.hash("password")), scrypt_hasher)
+        self.assertIsNone(identify_hasher("md5$1$salt$hash"))
+
+    def test_run_a_single_hasher(self):
+        hashed_password = pbkdf2_hasher.hash("password")
+        with mock.patch.object(scrypt_hasher, "compute") as compute:
+            self.assertEqual(
+                check_password("wrong password", hashed_password), (False, False)
+            )
+            self.assertEqual(check_password("password", hashed_password), (True, True))
+        compute.assert_not_called()
+
+    def test_need_rehash_when_params_change(self):
+        hashed_password = ScryptPasswordHasher(work_factor=4).hash("password")
+        self.assertEqual(check_password("password", hashed_password), (True, True))
+        hashed_password = scrypt_hasher.hash("password")
+        self.assertEqual(check_password("password", hashed_password), (True, False))
+
+    def test_rehash_legacy_hashes(self):
+        salt = "a" * 32
+        legacy = salt + pbkdf2_hasher.compute("password", salt, pbkdf2_hasher.params)
+        self.assertEqual(check_password("password", legacy), (True, True))
+        self.assertEqual(check_password("wrong password", legacy), (False, False))
+
+    def test_unknown_algorithm(self):
+        self.assertEqual(check_password("password", "md5$1$salt$hash"), (False, False))
+
+
+class MemoryLimiterTests(SimpleTestCase):
+    def test_acquire_within_the_budget(self):
+        limiter = MemoryLimiter(budget=100, timeout=0)
+        with limiter.limit(60), limiter.limit(40):
+            self.assertEqual(limiter.get_metrics()["in_use"], 100)
+            with self.assertRaises(HasherOverloaded):
+                limiter.acquire(1)
+        metrics = limiter.get_metrics()
+        self.assertEqual(metrics["in_use"], 0)
+        self.assertEqual(metrics["acquired"], 2)
+        self.assertEqual(metrics["timeouts"], 1)
+
+    def test_run_oversized_hashes_alone(self):
+        limiter = MemoryLimiter(budget=100, timeout=0)
+        with limiter.limit(1000):
+            self.assertEqual(limiter.get_metrics()["in_use"], 100)
+        self.assertEqual(limiter.get_metrics()["in_use"], 0)
+
+    def test_queue_until_memory_is_released(self):
+        limiter = MemoryLimiter(budget=100, timeout=5)
+        limiter.acquire(100)
+        thread = threading.Thread(target=limiter.acquire, args=(50,))
+        thread.start()
+        while not limiter.get_metrics()["queue_depth"]:
+            time.sleep(0.001)
+        limiter.release(100)
+        thread.join()
+        metrics = limiter.get_metrics()
+        self.assertEqual(metrics["in_use"], 50)
+        self.assertEqual(metrics["queue_depth"], 0)
+        self.assertEqual(metrics["max_queue_depth"], 1)
+        self.assertGreater(metrics["max_wait_time"], 0)
+
+    def test_no_budget(self):
+        limiter = MemoryLimiter(timeout=0)
+        with limiter.limit(10**12):
+            limiter.acquire(10**12)
+
+    @override_settings(
+        AUTH_PASSWORD_HASHER_MEMORY_BUDGET=1024,
+        AUTH_PASSWORD_HASHER_QUEUE_TIMEOUT=0,
+    )
+    def test_limit_hashers(self):
+        with get_limiter().limit(1024):
+            with self.assertRaises(HasherOverloaded):
+                pbkdf2_hasher.hash("password")
+        pbkdf2_hasher.hash("password")
+
+    def test_memory_usage(self):
+        self.assertEqual(
+            ScryptPasswordHasher(work_factor=2**14).get_memory_usage("16384,8,1"),
+            16 * 1024 * 1024,
+        )
+        self.assertEqual(
+            argon2_hasher.get_memory_usage(Argon2PasswordHasher().params),
+            100 * 1024 * 1024,
+        )
+
+
 class BasePasswordHasherTest(TestCase):
     def test_abstract(self):
         expected_error = "Can't instantiate abstract class"
@@ -58,10 +169,33 @@ class PasswordHasherTestMixin:
     def test_hashed_password_must_not_be_blank(self):
         self.assertNotEqual(self.hashed_password, "")
 
+    def test_prefix_hash_with_algorithm_and_params(self):
+        algorithm, params, salt, hash_ = self.hashed_password.split("$", 3)
+        self.assertEqual(algorithm, self.hasher.algorithm)
+        self.assertEqual(params, self.hasher.params)
+        self.assertFalse(self.hasher.needs_rehash(self.hashed_password))
+
+    async def test_hash_and_verify_in_the_thread_pool(self):
+        hashed_password = await self.hasher.ahash(self.password)
+        self.assertTrue(self.hasher.verify(self.password, hashed_password))
+        self.assertTrue(await self.hasher.averify(self.password, hashed_password))
+        self.assertFalse(await self.hasher.averify("password", hashed_password))
+
 
 class PBKDF2PasswordHasherTest(PasswordHasherTestMixin, TestCase):
     hasher = pbkdf2_hasher
 
+    def test_verify_with_the_stored_params(self):
+        hasher = PBKDF2PasswordHasher(iterations=2)
+        self.assertTrue(hasher.verify(self.password, self.hashed_password))
+        self.assertTrue(hasher.needs_rehash(self.hashed_password))
+
+    def test_verify_legacy_hash(self):
+        salt = "a" * 32
+        legacy = salt + self.hasher.compute(self.password, salt, self.hasher.params)
+        self.assertTrue(self.hasher.verify_legacy(self.password, legacy))
+        self.assertFalse(self.hasher.verify_legacy("password", legacy))
+
 
 @unittest.skipUnless(argon2, "argon2-cffi not installed")
 class Argon2PasswordHasherTest(PasswordHasherTestMixin, TestCase):
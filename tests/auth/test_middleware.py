@@ -1,9 +1,16 @@
+import re
 from datetime import datetime
-from django.test import TestCase, RequestFactory
+from unittest import mock
+from django.utils import timezone
+from asgiref.sync import iscoroutinefunction
+from django.test import TestCase, RequestFactory, AsyncRequestFactory, override_settings
 from django.http import HttpResponse
-from django.conf import settings
+from django.urls import path
+from jommerce.auth.conf import settings
+from jommerce.auth.decorators import sessionless
 from jommerce.auth.middleware import AuthenticationMiddleware, AnonymousUser
-from jommerce.auth.models import User, Session
+from jommerce.auth.models import User, Session, get_default_expire_date
+from jommerce.auth.stores import DatabaseSessionStore
 
 SESSION_COOKIE_NAME = settings.AUTH_SESSION_COOKIE_NAME
 
@@ -12,7 +19,9 @@ class AuthenticationMiddlewareTests(TestCase):
     @classmethod
     def setUpTestData(cls):
         user = User.objects.create(email="test@example.com", password="123456")
-        cls.session = Session.objects.create(id="user_session", user=user)
+        cls.session = Session.objects.create(
+            id="user_session", user=user, ip="127.0.0.1"
+        )
         cls.user = user
 
     def setUp(self) -> None:
@@ -89,6 +98,72 @@ class AuthenticationMiddlewareTests(TestCase):
         except Session.DoesNotExist:
             self.fail("The desired session has not been saved")
 
+    def test_anonymous_request_without_queries(self):
+        with self.assertNumQueries(0):
+            response = self.middleware(self.request)
+        self.assertNotIn(SESSION_COOKIE_NAME, response.cookies)
+
+    def test_create_session_lazily(self):
+        def view(request):
+            request.session["key"] = "value"
+            return HttpResponse()
+
+        middleware = AuthenticationMiddleware(view)
+        response = middleware(self.request)
+        session = Session.objects.get(pk=response.cookies[SESSION_COOKIE_NAME].value)
+        self.assertEqual(session.data, {"key": "value"})
+        self.assertIsNone(session.user)
+        self.assertEqual(session.ip, "127.0.0.1")
+
+    def test_not_saving_unchanged_sessions(self):
+        Session.objects.create(id="unchanged_session", user=self.user, ip="127.0.0.1")
+        self.request.COOKIES[SESSION_COOKIE_NAME] = "unchanged_session"
+        with self.assertNumQueries(1):
+            self.middleware(self.request)
+
+    def test_load_user_lazily(self):
+        self.request.COOKIES[SESSION_COOKIE_NAME] = "user_session"
+        with self.assertNumQueries(1):
+            self.middleware(self.request)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.request.user, self.user)
+        with self.assertNumQueries(0):
+            self.assertTrue(self.request.user.is_authenticated)
+
+    @override_settings(AUTH_SESSION_STORE="tests.auth.test_middleware.select_related")
+    def test_load_user_with_the_session(self):
+        self.request.COOKIES[SESSION_COOKIE_NAME] = "user_session"
+        with self.assertNumQueries(1):
+            self.middleware(self.request)
+            self.assertEqual(self.request.user, self.user)
+
+    @override_settings(AUTH_SESSION_RENEWAL_INTERVAL=60 * 60 * 24)
+    def test_renew_session(self):
+        expire_date = get_default_expire_date() - timezone.timedelta(days=2)
+        Session.objects.create(
+            id="old_session", user=self.user, ip="127.0.0.1", expire_date=expire_date
+        )
+        self.request.COOKIES[SESSION_COOKIE_NAME] = "old_session"
+        with self.assertNumQueries(2):
+            response = self.middleware(self.request)
+        session = Session.objects.get(pk="old_session")
+        self.assertGreater(session.expire_date, expire_date)
+        self.assertEqual(response.cookies[SESSION_COOKIE_NAME].value, "old_session")
+
+    @override_settings(AUTH_SESSION_RENEWAL_INTERVAL=60 * 60 * 24)
+    def test_throttle_session_renewals(self):
+        expire_date = get_default_expire_date() - timezone.timedelta(hours=1)
+        Session.objects.create(
+            id="recent_session", user=self.user, ip="127.0.0.1", expire_date=expire_date
+        )
+        self.request.COOKIES[SESSION_COOKIE_NAME] = "recent_session"
+        with self.assertNumQueries(1):
+            response = self.middleware(self.request)
+        self.assertEqual(
+            Session.objects.get(pk="recent_session").expire_date, expire_date
+        )
+        self.assertNotIn(SESSION_COOKIE_NAME, response.cookies)
+
     def test_delete_expired_session(self):
         Session.objects.create(
             id="expired session",
@@ -100,6 +175,17 @@ class AuthenticationMiddlewareTests(TestCase):
         with self.assertRaises(Session.DoesNotExist):  # noqa
             Session.objects.get(pk="expired session")
 
+    def test_reject_revoked_session(self):
+        session = Session.objects.get(pk="user_session")
+        self.user.revoke_sessions()
+        request = RequestFactory().get("/")
+        request.COOKIES[SESSION_COOKIE_NAME] = "user_session"
+        # A cached or signed session outlives the row deleted by revoke_sessions.
+        with mock.patch.object(DatabaseSessionStore, "load", return_value=session):
+            self.middleware(request)
+        self.assertIsInstance(request.user, AnonymousUser)
+        self.assertIsNone(request.session.user_id)
+
     def test_secure_session_cookie(self):
         self.request.COOKIES[SESSION_COOKIE_NAME] = "user_session"
         with self.settings(AUTH_SESSION_COOKIE_SECURE=True):
@@ -173,3 +259,141 @@ class AuthenticationMiddlewareTests(TestCase):
             self.request.COOKIES["session_key"] = "user_session"
             response = self.middleware(self.request)
             self.assertIn("session_key", response.cookies)
+
+
+@override_settings(
+    ROOT_URLCONF="tests.auth.test_middleware",
+    AUTH_SESSION_EXEMPT_PATHS=["/static/", re.compile(r"^/health/?$")],
+)
+class SessionlessRequestTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create(email="test@example.com", password="123456")
+        Session.objects.create(id="user_session", user=user, ip="127.0.0.1")
+
+    def setUp(self):
+        self.middleware = AuthenticationMiddleware(lambda request: HttpResponse())
+
+    def assertSessionless(self, path):
+        request = RequestFactory().get(path)
+        request.COOKIES[SESSION_COOKIE_NAME] = "user_session"
+        with self.assertNumQueries(0):
+            response = self.middleware(request)
+            self.assertIsInstance(request.user, AnonymousUser)
+        self.assertFalse(hasattr(request, "session"))
+        self.assertNotIn(SESSION_COOKIE_NAME, response.cookies)
+
+    def test_exempt_path_prefix(self):
+        self.assertSessionless("/static/style.css")
+
+    def test_exempt_path_regex(self):
+        self.assertSessionless("/health")
+        self.assertSessionless("/health/")
+
+    def test_sessionless_view(self):
+        self.assertSessionless("/feed/")
+
+    def test_other_paths(self):
+        request = RequestFactory().get("/healthy/")
+        request.COOKIES[SESSION_COOKIE_NAME] = "user_session"
+        self.middleware(request)
+        self.assertEqual(request.session.pk, "user_session")
+
+    async def test_sessionless_async_request(self):
+        async def view(request):
+            return HttpResponse()
+
+        request = AsyncRequestFactory().get("/feed/")
+        request.COOKIES[SESSION_COOKIE_NAME] = "user_session"
+        await AuthenticationMiddleware(view)(request)
+        self.assertIsInstance(await request.auser(), AnonymousUser)
+        self.assertFalse(hasattr(request, "session"))
+
+
+class AsyncAuthenticationMiddlewareTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(email="test@example.com", password="123456")
+        cls.session = Session.objects.create(id="user_session", user=cls.user)
+
+    def setUp(self):
+        self.request = AsyncRequestFactory().get("/")
+
+        async def view(request):
+            return HttpResponse()
+
+        self.middleware = AuthenticationMiddleware(view)
+
+    def test_async_capable(self):
+        self.assertTrue(AuthenticationMiddleware.sync_capable)
+        self.assertTrue(AuthenticationMiddleware.async_capable)
+        self.assertTrue(iscoroutinefunction(self.middleware))
+        self.assertFalse(iscoroutinefunction(AuthenticationMiddleware(HttpResponse)))
+
+    async def test_identify_an_anonymous_user(self):
+        await self.middleware(self.request)
+        self.assertIsInstance(await self.request.auser(), AnonymousUser)
+
+    async def test_identify_authenticated_user(self):
+        self.request.COOKIES[SESSION_COOKIE_NAME] = "user_session"
+        response = await self.middleware(self.request)
+        self.assertEqual(await self.request.auser(), self.user)
+        self.assertEqual(self.request.session, self.session)
+        self.assertEqual(response.cookies[SESSION_COOKIE_NAME].value, "user_session")
+
+    async def test_load_user_lazily(self):
+        self.request.COOKIES[SESSION_COOKIE_NAME] = "user_session"
+        await self.middleware(self.request)
+        self.assertFalse(Session.user.is_cached(self.request.session))
+        await self.request.auser()
+        self.assertTrue(Session.user.is_cached(self.request.session))
+
+    async def test_save_session(self):
+        async def view(request):
+            request.session["key"] = "value"
+            return HttpResponse()
+
+        response = await AuthenticationMiddleware(view)(self.request)
+        session = await Session.objects.aget(
+            pk=response.cookies[SESSION_COOKIE_NAME].value
+        )
+        self.assertEqual(session.data, {"key": "value"})
+
+    async def test_skip_saving_unchanged_sessions(self):
+        await Session.objects.acreate(
+            id="unchanged_session", user=self.user, ip="127.0.0.1"
+        )
+
+        async def view(request):
+            await request.auser()
+            request.session.get("key")
+            return HttpResponse()
+
+        middleware = AuthenticationMiddleware(view)
+        with mock.patch("jommerce.auth.stores.sync_to_async") as sync_to_async:
+            await middleware(self.request)
+            self.request = AsyncRequestFactory().get("/")
+            self.request.COOKIES[SESSION_COOKIE_NAME] = "unchanged_session"
+            response = await middleware(self.request)
+        sync_to_async.assert_not_called()
+        self.assertEqual(
+            response.cookies[SESSION_COOKIE_NAME].value, "unchanged_session"
+        )
+
+    async def test_delete_expired_session(self):
+        await Session.objects.acreate(
+            id="expired session",
+            data={"key": "value"},
+            expire_date=datetime(2021, 8, 1),
+        )
+        self.request.COOKIES[SESSION_COOKIE_NAME] = "expired session"
+        await self.middleware(self.request)
+        self.assertFalse(await Session.objects.filter(pk="expired session").aexists())
+
+
+select_related = DatabaseSessionStore(select_related_user=True)
+
+urlpatterns = [
+    path("feed/", sessionless(lambda request: HttpResponse())),
+    path("healthy/", lambda request: HttpResponse()),
+]
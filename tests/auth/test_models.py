@@ -1,6 +1,10 @@
-from django.test import TestCase, override_settings
+from django.db import connection
+from unittest import mock
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 from jommerce.auth.models import User, AnonymousUser, Session
+from tests.auth.test_hashers import pbkdf2_hasher
 
 
 class UserModelTests(TestCase):
@@ -65,6 +69,139 @@ class UserModelTests(TestCase):
         ):
             self.assertIs(user.verify_password(password), False)
 
+    async def test_averify_password(self):
+        self.assertIs(await self.user.averify_password("123456"), True)
+        self.assertIs(await self.user.averify_password("password"), False)
+
+    async def test_asave_hashes_the_password(self):
+        user = User(email="user@gmail.com", password="password")
+        await user.asave()
+        self.assertNotEqual(user.password, "password")
+        user = await User.objects.aget(pk=user.pk)
+        self.assertIs(user.verify_password("password"), True)
+
+    async def test_upgrade_password_hasher_asynchronously(self):
+        with self.settings(
+            AUTH_PASSWORD_HASHERS=[
+                "tests.auth.test_hashers.scrypt_hasher",
+                "tests.auth.test_hashers.pbkdf2_hasher",
+            ]
+        ):
+            self.assertIs(await self.user.averify_password("123456"), True)
+        with self.settings(
+            AUTH_PASSWORD_HASHERS=["tests.auth.test_hashers.scrypt_hasher"]
+        ):
+            user = await User.objects.aget(pk=self.user.pk)
+            self.assertIs(await user.averify_password("123456"), True)
+
+    def test_revoke_sessions(self):
+        Session.objects.create(id="first", user=self.user)
+        current = Session.objects.create(id="current", user=self.user)
+        with self.assertNumQueries(4):
+            self.user.revoke_sessions(except_current=current)
+        current.save()
+        self.assertEqual(self.user.session_generation, 1)
+        self.assertQuerysetEqual(
+            self.user.sessions.values_list("pk", flat=True), ["current"]
+        )
+        self.assertFalse(current.is_revoked(self.user))
+
+    def test_revoke_all_sessions(self):
+        session = Session.objects.create(user=self.user)
+        self.user.revoke_sessions()
+        self.assertFalse(self.user.sessions.exists())
+        self.assertTrue(session.is_revoked(self.user))
+
+    def test_save_keeps_the_session_generation(self):
+        user = User.objects.get(pk=self.user.pk)
+        self.user.revoke_sessions()
+        user.status = User.Status.ACTIVE
+        user.save()
+        user = User.objects.get(pk=self.user.pk)
+        self.assertEqual(user.status, User.Status.ACTIVE)
+        self.assertEqual(user.session_generation, 1)
+
+    def test_bind_new_sessions_to_the_current_generation(self):
+        self.user.revoke_sessions()
+        session = Session.objects.create(user=self.user)
+        self.assertEqual(session.generation, 1)
+        self.assertFalse(session.is_revoked(self.user))
+
+
+@override_settings(
+    AUTH_PASSWORD_HASHERS=[
+        "tests.auth.test_hashers.scrypt_hasher",
+        "tests.auth.test_hashers.pbkdf2_hasher",
+    ]
+)
+class RehashPasswordTests(TransactionTestCase):
+    def setUp(self):
+        user = User.objects.create(email="test@example.com", password="123456")
+        User.objects.filter(pk=user.pk).update(password=pbkdf2_hasher.hash("123456"))
+        self.user = User.objects.get(pk=user.pk)
+
+    def test_rehash_inline(self):
+        self.assertIs(self.user.verify_password("123456"), True)
+        self.assertTrue(self.user.password.startswith("scrypt$"))
+        self.assertEqual(User.objects.get(pk=self.user.pk).password, self.user.password)
+
+    @override_settings(AUTH_PASSWORD_REHASH_IN_BACKGROUND=True)
+    def test_rehash_in_background(self):
+        with mock.patch.object(User, "rehash_password") as rehash_password:
+            self.assertIs(self.user.verify_password("123456"), True)
+        rehash_password.assert_called_once_with("123456")
+        self.user.rehash_password("123456").result()
+        self.assertTrue(self.user.password.startswith("pbkdf2_sha256$"))
+        user = User.objects.get(pk=self.user.pk)
+        self.assertTrue(user.password.startswith("scrypt$"))
+        self.assertIs(user.verify_password("123456"), True)
+
+    @override_settings(AUTH_PASSWORD_REHASH_IN_BACKGROUND=True)
+    def test_save_after_rehash_in_background(self):
+        self.user.rehash_password("123456").result()
+        self.user.status = User.Status.ACTIVE
+        self.user.save()
+        user = User.objects.get(pk=self.user.pk)
+        self.assertEqual(user.status, User.Status.ACTIVE)
+        self.assertTrue(user.password.startswith("scrypt$"))
+
+    def test_do_not_overwrite_a_changed_password(self):
+        User.objects.filter(pk=self.user.pk).update(password="changed")
+        self.assertIs(self.user.verify_password("123456"), True)
+        self.assertEqual(User.objects.get(pk=self.user.pk).password, "changed")
+
+
+class UserManagerTests(TestCase):
+    def test_bulk_create_users(self):
+        rows = (
+            {"email": f"user{i}@example.com", "password": f"password{i}"}
+            for i in range(5)
+        )
+        callback = mock.Mock()
+        with self.assertNumQueries(3):
+            total = User.objects.bulk_create_users(
+                rows, batch_size=2, processes=1, callback=callback
+            )
+        self.assertEqual(total, 5)
+        self.assertEqual(callback.call_args_list, [((2,),), ((4,),), ((5,),)])
+        user = User.objects.get(email="user3@example.com")
+        self.assertIs(user.verify_password("password3"), True)
+
+    def test_hash_in_a_process_pool(self):
+        rows = [{"email": "test@example.com", "password": "123456", "status": 1}]
+        User.objects.bulk_create_users(rows, processes=2)
+        user = User.objects.get(email="test@example.com")
+        self.assertEqual(user.status, User.Status.ACTIVE)
+        self.assertIs(user.verify_password("123456"), True)
+
+    def test_keep_hashed_passwords(self):
+        password_hash = pbkdf2_hasher.hash("123456")
+        rows = [{"email": "test@example.com", "password_hash": password_hash}]
+        with mock.patch.object(pbkdf2_hasher, "hash") as hash:
+            User.objects.bulk_create_users(rows, processes=1)
+        hash.assert_not_called()
+        self.assertEqual(User.objects.get().password, password_hash)
+
 
 class AnonymousUserTests(TestCase):
     @classmethod
@@ -92,12 +229,50 @@ class SessionModelTests(TestCase):
         self.assertEqual(len(self.session.id), max_length)
         self.assertNotEqual(self.session.id, Session().id)
 
+    def test_generate_session_id_without_queries(self):
+        with self.assertNumQueries(0):
+            Session()
+
+    def test_create_session_with_a_single_insert(self):
+        with CaptureQueriesContext(connection) as context:
+            self.session.save()
+        statements = [
+            query["sql"]
+            for query in context.captured_queries
+            if "SAVEPOINT" not in query["sql"]
+        ]
+        self.assertEqual(len(statements), 1)
+        self.assertTrue(statements[0].startswith("INSERT"))
+
+    def test_retry_on_session_id_collision(self):
+        Session.objects.create(id="duplicate_session", data={"key": "value"})
+        session = Session(id="duplicate_session", data={"key": "another value"})
+        session.save()
+        self.assertNotEqual(session.id, "duplicate_session")
+        self.assertEqual(Session.objects.get(pk=session.id)["key"], "another value")
+        self.assertEqual(Session.objects.get(pk="duplicate_session")["key"], "value")
+
     @override_settings(AUTH_SESSION_COOKIE_AGE=10)
     def test_default_expire_date(self):
         self.assertEqual(
             Session().expire_date, timezone.now() + timezone.timedelta(seconds=10)
         )
 
+    def test_renew_without_sliding_expiration(self):
+        self.session.expire_date = timezone.now()
+        self.assertIs(self.session.renew(), False)
+
+    @override_settings(AUTH_SESSION_COOKIE_AGE=100, AUTH_SESSION_RENEWAL_INTERVAL=10)
+    def test_renew(self):
+        expire_date = timezone.now() + timezone.timedelta(seconds=95)
+        self.session.expire_date = expire_date
+        self.assertIs(self.session.renew(), False)
+        self.assertEqual(self.session.expire_date, expire_date)
+        self.session.expire_date = timezone.now() + timezone.timedelta(seconds=80)
+        self.assertIs(self.session.renew(), True)
+        self.assertGreater(self.session.expire_date, expire_date)
+        self.assertIn("expire_date", self.session.get_changed_fields())
+
     def test_new_session(self):
         self.assertIs(self.session.modified, False)
         self.assertIs(self.session.accessed, False)
@@ -125,6 +300,69 @@ class SessionModelTests(TestCase):
         with self.assertRaises(Session.DoesNotExist):  # noqa
             Session.objects.get(pk=self.session.id)
 
+    def test_delete_session_without_user_and_data(self):
+        self.session.save()
+        self.session.clear()
+        self.session.save()
+        with self.assertRaises(Session.DoesNotExist):  # noqa
+            Session.objects.get(pk=self.session.id)
+
+    def test_do_not_save_unchanged_sessions(self):
+        self.session.save()
+        with self.assertNumQueries(0):
+            self.session.save()
+        session = Session.objects.get(pk=self.session.pk)
+        with self.assertNumQueries(0):
+            session.save()
+        session["key"]
+        with self.assertNumQueries(0):
+            session.save()
+
+    def test_save_only_changed_fields(self):
+        self.session.save()
+        session = Session.objects.get(pk=self.session.pk)
+        self.assertEqual(session.get_changed_fields(), [])
+        session["key"] = "changed value"
+        self.assertEqual(session.get_changed_fields(), ["data"])
+        with CaptureQueriesContext(connection) as context:
+            session.save()
+        self.assertEqual(len(context.captured_queries), 1)
+        self.assertNotIn("expire_date", context.captured_queries[0]["sql"])
+        self.assertEqual(session.get_changed_fields(), [])
+        self.assertEqual(Session.objects.get(pk=session.pk)["key"], "changed value")
+
+    def test_save_a_deleted_session(self):
+        self.session.save()
+        session = Session.objects.get(pk=self.session.pk)
+        Session.objects.filter(pk=session.pk).delete()
+        session["key"] = "changed value"
+        session.save()
+        self.assertTrue(session.dropped)
+        self.assertFalse(Session.objects.filter(pk=session.pk).exists())
+
+    def test_cycle_key(self):
+        self.session.save()
+        session = Session.objects.get(pk=self.session.pk)
+        session.cycle_key()
+        self.assertNotEqual(session.pk, self.session.pk)
+        self.assertEqual(session["key"], "value")
+        session.save()
+        self.assertFalse(Session.objects.filter(pk=self.session.pk).exists())
+        self.assertEqual(Session.objects.get(pk=session.pk)["key"], "value")
+
+    def test_track_user_assignment(self):
+        user = User.objects.create(email="test@example.com", password="123456")
+        self.session.save()
+        session = Session.objects.get(pk=self.session.pk)
+        session.user = user
+        self.assertEqual(session.get_changed_fields(), ["user"])
+        session.save()
+        self.assertEqual(Session.objects.get(pk=session.pk).user, user)
+        session.user = None
+        self.assertEqual(session.get_changed_fields(), ["user"])
+        session.save()
+        self.assertIsNone(Session.objects.get(pk=session.pk).user)
+
     def test_get(self):
         self.assertEqual(self.session.get("key"), "value")
         self.assertIs(self.session.accessed, True)
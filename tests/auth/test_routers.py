@@ -0,0 +1,70 @@
+from django.test import TestCase, SimpleTestCase, override_settings
+from jommerce.auth.models import User, Session
+from jommerce.auth.routers import SessionRouter
+from jommerce.auth.stores import DatabaseSessionStore
+
+
+@override_settings(AUTH_SESSION_DATABASE="sessions")
+class SessionRouterTests(SimpleTestCase):
+    def setUp(self):
+        self.router = SessionRouter()
+
+    def test_route_sessions(self):
+        self.assertEqual(self.router.db_for_read(Session), "sessions")
+        self.assertEqual(self.router.db_for_write(Session), "sessions")
+        self.assertIsNone(self.router.db_for_read(User))
+        self.assertIsNone(self.router.db_for_write(User))
+
+    def test_do_not_follow_sessions_to_their_database(self):
+        session = Session()
+        session._state.db = "sessions"
+        self.assertEqual(self.router.db_for_read(User, instance=session), "default")
+
+    def test_allow_relation(self):
+        self.assertTrue(self.router.allow_relation(Session(), User()))
+        self.assertIsNone(self.router.allow_relation(User(), User()))
+
+    def test_allow_migrate(self):
+        self.assertTrue(self.router.allow_migrate("sessions", "auth", "session"))
+        self.assertFalse(self.router.allow_migrate("default", "auth", "session"))
+        self.assertFalse(self.router.allow_migrate("sessions", "blog", "post"))
+        # Only for the foreign key of 0001_initial, dropped by 0010.
+        self.assertTrue(self.router.allow_migrate("sessions", "auth", "user"))
+        self.assertIsNone(self.router.allow_migrate("default", "auth", "user"))
+
+    @override_settings(AUTH_SESSION_DATABASE=None)
+    def test_disabled(self):
+        self.assertIsNone(self.router.db_for_read(Session))
+        self.assertIsNone(self.router.allow_migrate("default", "auth", "session"))
+
+
+@override_settings(
+    DATABASE_ROUTERS=["jommerce.auth.routers.SessionRouter"],
+    AUTH_SESSION_DATABASE="sessions",
+)
+class SessionDatabaseTests(TestCase):
+    databases = {"default", "sessions"}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(email="test@example.com", password="123456")
+
+    def test_save_and_load_session(self):
+        Session.objects.create(id="user_session", user=self.user)
+        self.assertTrue(Session.objects.using("sessions").filter(pk="user_session"))
+        self.assertFalse(Session.objects.using("default").filter(pk="user_session"))
+        session = DatabaseSessionStore().load("user_session")
+        self.assertEqual(session.user, self.user)
+
+    def test_do_not_join_users_across_databases(self):
+        Session.objects.create(id="user_session", user=self.user)
+        store = DatabaseSessionStore(select_related_user=True)
+        with self.assertNumQueries(1, using="sessions"):
+            session = store.load("user_session")
+        with self.assertNumQueries(1, using="default"):
+            self.assertEqual(session.user, self.user)
+
+    def test_delete_sessions_with_their_user(self):
+        Session.objects.create(id="user_session", user=self.user)
+        self.user.delete()
+        self.assertFalse(Session.objects.exists())
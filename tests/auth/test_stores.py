@@ -0,0 +1,372 @@
+from unittest import mock
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.test import TestCase, SimpleTestCase, RequestFactory, override_settings
+from django.http import HttpResponse
+from jommerce.auth.conf import settings
+from jommerce.auth.middleware import AuthenticationMiddleware
+from jommerce.auth.models import User, Session
+from jommerce.auth.stores import (
+    LocalCache,
+    CachedSessionStore,
+    DatabaseSessionStore,
+    SignedCookieSessionStore,
+    get_session_store,
+)
+from jommerce.auth.utils import generate_random_string
+
+
+class LocalCacheTests(SimpleTestCase):
+    def test_get_and_set(self):
+        local_cache = LocalCache()
+        self.assertIsNone(local_cache.get("key"))
+        self.assertEqual(local_cache.get("key", "default"), "default")
+        local_cache.set("key", "value")
+        self.assertEqual(local_cache.get("key"), "value")
+
+    def test_delete(self):
+        local_cache = LocalCache()
+        local_cache.set("key", "value")
+        local_cache.delete("key")
+        local_cache.delete("key does not exist")
+        self.assertIsNone(local_cache.get("key"))
+
+    def test_evict_least_recently_used(self):
+        local_cache = LocalCache(max_size=2)
+        local_cache.set("a", 1)
+        local_cache.set("b", 2)
+        local_cache.get("a")
+        local_cache.set("c", 3)
+        self.assertEqual(len(local_cache), 2)
+        self.assertEqual(local_cache.get("a"), 1)
+        self.assertIsNone(local_cache.get("b"))
+        self.assertEqual(local_cache.get("c"), 3)
+
+    def test_expire_entries(self):
+        local_cache = LocalCache(timeout=10)
+        with mock.patch("jommerce.auth.stores.time.monotonic", return_value=100):
+            local_cache.set("key", "value")
+        with mock.patch("jommerce.auth.stores.time.monotonic", return_value=109):
+            self.assertEqual(local_cache.get("key"), "value")
+        with mock.patch("jommerce.auth.stores.time.monotonic", return_value=110):
+            self.assertIsNone(local_cache.get("key"))
+
+
+class DatabaseSessionStoreTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(email="test@example.com", password="123456")
+        cls.session = Session.objects.create(id="user_session", user=cls.user)
+
+    def setUp(self):
+        self.store = DatabaseSessionStore()
+
+    def test_load(self):
+        self.assertEqual(self.store.load("user_session"), self.session)
+        self.assertIsNone(self.store.load("fake_session"))
+        self.assertIsNone(self.store.load(""))
+        self.assertIsNone(self.store.load(None))
+
+    def test_save_returns_session_key(self):
+        session = Session(user=self.user)
+        self.assertEqual(self.store.save(session), session.pk)
+        self.assertTrue(Session.objects.filter(pk=session.pk).exists())
+
+    def test_save_a_deleted_session(self):
+        session = self.store.load("user_session")
+        Session.objects.filter(pk="user_session").delete()
+        session["key"] = "value"
+        self.assertIsNone(self.store.save(session))
+
+    def test_delete(self):
+        self.store.delete(self.session)
+        self.assertFalse(Session.objects.filter(pk="user_session").exists())
+
+
+class CachedSessionStoreTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(email="test@example.com", password="123456")
+        cls.session = Session.objects.create(
+            id="user_session", user=cls.user, data={"key": "value"}
+        )
+
+    def setUp(self):
+        cache.clear()
+        store.local_cache.clear()
+        self.store = CachedSessionStore()
+
+    def test_load_from_database_once(self):
+        with self.assertNumQueries(1):
+            self.store.load("user_session")
+        with self.assertNumQueries(0):
+            session = self.store.load("user_session")
+        self.assertEqual(session, self.session)
+        self.assertEqual(session.data, {"key": "value"})
+        self.assertEqual(session.user_id, self.user.pk)
+
+    def test_load_from_shared_cache(self):
+        self.store.load("user_session")
+        other_store = CachedSessionStore()
+        with self.assertNumQueries(0):
+            self.assertEqual(other_store.load("user_session"), self.session)
+
+    def test_load_session_that_does_not_exist(self):
+        self.assertIsNone(self.store.load("fake_session"))
+        self.assertIsNone(self.store.load(""))
+
+    def test_load_user_from_database_once(self):
+        with self.assertNumQueries(2):
+            self.assertEqual(
+                self.store.load_user(self.store.load("user_session")), self.user
+            )
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                self.store.load_user(self.store.load("user_session")), self.user
+            )
+
+    def test_load_user_of_anonymous_session(self):
+        with self.assertNumQueries(0):
+            self.assertIsNone(self.store.load_user(Session(id="anonymous_session")))
+
+    def test_cache_user_loaded_with_the_session(self):
+        store = CachedSessionStore(select_related_user=True)
+        with self.assertNumQueries(1):
+            store.load("user_session")
+        with self.assertNumQueries(0):
+            self.assertEqual(store.load_user(store.load("user_session")), self.user)
+
+    def test_cached_sessions_are_independent_copies(self):
+        session = self.store.load("user_session")
+        session["key"] = "changed value"
+        self.assertEqual(self.store.load("user_session")["key"], "value")
+
+    @override_settings(AUTH_SESSION_STORE="tests.auth.test_stores.store")
+    def test_write_through_on_save(self):
+        store.load("user_session")
+        session = Session.objects.get(pk="user_session")
+        session["key"] = "changed value"
+        session.save()
+        with self.assertNumQueries(0):
+            self.assertEqual(store.load("user_session")["key"], "changed value")
+
+    @override_settings(AUTH_SESSION_STORE="tests.auth.test_stores.store")
+    def test_evict_on_delete(self):
+        store.load("user_session")
+        Session.objects.get(pk="user_session").delete()
+        self.assertIsNone(store.load("user_session"))
+
+    @override_settings(AUTH_SESSION_STORE="tests.auth.test_stores.store")
+    def test_evict_on_logout(self):
+        session = store.load("user_session")
+        session.user = None
+        session.clear()
+        session.save()
+        self.assertIsNone(store.load("user_session"))
+
+    @override_settings(AUTH_SESSION_STORE="tests.auth.test_stores.store")
+    def test_evict_sessions_of_deleted_users(self):
+        store.load_user(store.load("user_session"))
+        User.objects.get(pk=self.user.pk).delete()
+        self.assertIsNone(store.load("user_session"))
+
+    def test_load_deleted_user(self):
+        session = self.store.load("user_session")
+        User.objects.filter(pk=self.user.pk).delete()
+        self.assertIsNone(self.store.load_user(session))
+        self.assertIsNone(DatabaseSessionStore().load_user(session))
+
+    @override_settings(AUTH_SESSION_STORE="tests.auth.test_stores.store")
+    def test_evict_user_on_save(self):
+        store.load_user(store.load("user_session"))
+        user = User.objects.get(pk=self.user.pk)
+        user.status = User.Status.ACTIVE
+        user.save()
+        self.assertEqual(
+            store.load_user(store.load("user_session")).status, User.Status.ACTIVE
+        )
+
+
+@override_settings(AUTH_SESSION_STORE="tests.auth.test_stores.store")
+class CachedSessionStoreMiddlewareTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(email="test@example.com", password="123456")
+        Session.objects.create(id="user_session", user=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        store.local_cache.clear()
+        self.request = RequestFactory().get("/")
+        self.request.COOKIES[settings.AUTH_SESSION_COOKIE_NAME] = "user_session"
+        self.middleware = AuthenticationMiddleware(lambda request: HttpResponse())
+
+    def test_get_session_store(self):
+        self.assertIs(get_session_store(), store)
+
+    def test_warm_request_resolves_session_and_user_without_reads(self):
+        self.middleware(self.request)
+        request = RequestFactory().get("/")
+        request.COOKIES[settings.AUTH_SESSION_COOKIE_NAME] = "user_session"
+        with CaptureQueriesContext(connection) as context:
+            self.middleware(request)
+        self.assertFalse(
+            [query for query in context.captured_queries if "SELECT" in query["sql"]]
+        )
+        self.assertEqual(request.session.pk, "user_session")
+        self.assertEqual(request.user, self.user)
+
+    def test_revoked_session_is_evicted(self):
+        self.middleware(self.request)
+        User.objects.get(pk=self.user.pk).revoke_sessions()
+        request = RequestFactory().get("/")
+        request.COOKIES[settings.AUTH_SESSION_COOKIE_NAME] = "user_session"
+
+        def view(request):
+            request.session["cart"] = [1]
+            return HttpResponse()
+
+        AuthenticationMiddleware(view)(request)
+        self.assertNotEqual(request.session.pk, "user_session")
+        self.assertFalse(Session.objects.filter(user=self.user).exists())
+
+
+class SignedCookieSessionStoreTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(email="test@example.com", password="123456")
+
+    def setUp(self):
+        self.store = SignedCookieSessionStore(max_size=200)
+
+    def test_round_trip(self):
+        session = Session(user=self.user, data={"key": "value"})
+        value = self.store.save(session)
+        self.assertIn(":", value)
+        with self.assertNumQueries(0):
+            loaded = self.store.load(value)
+        self.assertEqual(loaded.user_id, self.user.pk)
+        self.assertEqual(loaded.data, {"key": "value"})
+        self.assertEqual(loaded.expire_date, session.expire_date.replace(microsecond=0))
+        self.assertFalse(Session.objects.exists())
+
+    def test_load_user(self):
+        session = self.store.load(self.store.save(Session(user=self.user)))
+        with self.assertNumQueries(1):
+            self.assertEqual(self.store.load_user(session), self.user)
+
+    def test_keep_the_session_generation(self):
+        self.user.revoke_sessions()
+        session = self.store.load(self.store.save(Session(user=self.user)))
+        self.assertEqual(session.generation, 1)
+        self.user.revoke_sessions()
+        self.assertTrue(session.is_revoked(self.user))
+
+    def test_reject_tampered_cookie(self):
+        value = self.store.save(Session(user=self.user))
+        self.assertIsNone(
+            self.store.load(value[:-1] + ("a" if value[-1] != "a" else "b"))
+        )
+        self.assertIsNone(self.store.load("fake:session"))
+
+    def test_do_not_save_empty_sessions(self):
+        self.assertIsNone(self.store.save(Session()))
+
+    def test_fall_back_to_database_for_oversized_sessions(self):
+        session = Session(user=self.user, data={"key": generate_random_string(300)})
+        value = self.store.save(session)
+        self.assertEqual(value, session.pk)
+        self.assertEqual(self.store.load(value), session)
+
+    def test_move_shrunk_sessions_to_the_cookie(self):
+        session = Session(user=self.user, data={"key": generate_random_string(300)})
+        session_key = self.store.save(session)
+        session = self.store.load(session_key)
+        session["key"] = "value"
+        self.assertIn(":", self.store.save(session))
+        self.assertFalse(Session.objects.filter(pk=session_key).exists())
+
+
+@override_settings(AUTH_SESSION_STORE="jommerce.auth.stores.signed_cookies")
+class SignedCookieSessionStoreMiddlewareTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(email="test@example.com", password="123456")
+
+    def login(self, request):
+        request.session.user = self.user
+        return HttpResponse()
+
+    def logout(self, request):
+        request.session.user = None
+        return HttpResponse()
+
+    def test_login_and_logout(self):
+        response = AuthenticationMiddleware(self.login)(RequestFactory().get("/"))
+        cookie = response.cookies[settings.AUTH_SESSION_COOKIE_NAME].value
+        self.assertFalse(Session.objects.exists())
+
+        request = RequestFactory().get("/")
+        request.COOKIES[settings.AUTH_SESSION_COOKIE_NAME] = cookie
+        AuthenticationMiddleware(lambda request: HttpResponse())(request)
+        self.assertEqual(request.user, self.user)
+
+        request = RequestFactory().get("/")
+        request.COOKIES[settings.AUTH_SESSION_COOKIE_NAME] = cookie
+        response = AuthenticationMiddleware(self.logout)(request)
+        self.assertEqual(response.cookies[settings.AUTH_SESSION_COOKIE_NAME].value, "")
+
+    def test_drop_the_cookie_of_a_deleted_user(self):
+        response = AuthenticationMiddleware(self.login)(RequestFactory().get("/"))
+        cookie = response.cookies[settings.AUTH_SESSION_COOKIE_NAME].value
+        self.user.delete()
+
+        request = RequestFactory().get("/")
+        request.COOKIES[settings.AUTH_SESSION_COOKIE_NAME] = cookie
+        response = AuthenticationMiddleware(
+            lambda request: HttpResponse(request.user.is_anonymous)
+        )(request)
+        self.assertEqual(response.content, b"True")
+        self.assertEqual(response.cookies[settings.AUTH_SESSION_COOKIE_NAME].value, "")
+
+
+@override_settings(AUTH_SESSION_STORE="tests.auth.test_stores.signed_cookies")
+class CachedFallbackTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(email="test@example.com", password="123456")
+
+    def setUp(self):
+        cache.clear()
+        signed_cookies.fallback.local_cache.clear()
+
+    def save_oversized_session(self):
+        session = Session(user=self.user, data={"key": generate_random_string(300)})
+        return signed_cookies.save(session)
+
+    def test_evict_on_logout(self):
+        session = signed_cookies.load(self.save_oversized_session())
+        session.user = None
+        session["key"] = generate_random_string(300)
+        signed_cookies.save(session)
+        self.assertIsNone(signed_cookies.load(session.pk).user_id)
+
+    def test_evict_on_delete(self):
+        session_key = self.save_oversized_session()
+        signed_cookies.load(session_key).delete()
+        self.assertIsNone(signed_cookies.load(session_key))
+
+    def test_reject_cookies_after_revoke_sessions(self):
+        value = signed_cookies.save(Session(user=self.user))
+        session = signed_cookies.load(value)
+        signed_cookies.load_user(session)
+        User.objects.get(pk=self.user.pk).revoke_sessions()
+        session = signed_cookies.load(value)
+        self.assertTrue(session.is_revoked(signed_cookies.load_user(session)))
+
+
+store = CachedSessionStore()
+signed_cookies = SignedCookieSessionStore(
+    fallback=CachedSessionStore(key_prefix="tests.signed"), max_size=200
+)
@@ -0,0 +1,111 @@
+from unittest import mock
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, RequestFactory, override_settings
+from jommerce.auth.models import User
+from jommerce.auth.throttling import TokenBucket, parse_rate, throttle
+
+
+class TokenBucketTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.bucket = TokenBucket("2/minute")
+
+    def test_parse_rate(self):
+        self.assertEqual(parse_rate("10/second"), (10, 1))
+        self.assertEqual(parse_rate("5/hour"), (5, 3600))
+
+    @mock.patch("jommerce.auth.throttling.time.time", return_value=1000)
+    def test_allow_bursts_up_to_the_capacity(self, time):
+        self.assertEqual(self.bucket.consume("key"), 0)
+        self.assertEqual(self.bucket.consume("key"), 0)
+        self.assertEqual(self.bucket.consume("key"), 30)
+        self.assertEqual(self.bucket.consume("other key"), 0)
+
+    def test_refill(self):
+        with mock.patch("jommerce.auth.throttling.time.time", return_value=1000):
+            self.bucket.consume("key")
+            self.bucket.consume("key")
+        with mock.patch("jommerce.auth.throttling.time.time", return_value=1020):
+            self.assertAlmostEqual(self.bucket.consume("key"), 10)
+        with mock.patch("jommerce.auth.throttling.time.time", return_value=1030):
+            self.assertEqual(self.bucket.consume("key"), 0)
+
+    @mock.patch("jommerce.auth.throttling.time.time", return_value=1000)
+    def test_fall_back_to_the_local_cache(self, time):
+        with mock.patch.object(cache, "add", side_effect=ConnectionError):
+            self.assertEqual(self.bucket.consume("key"), 0)
+            self.assertEqual(self.bucket.consume("key"), 0)
+            self.assertEqual(self.bucket.consume("key"), 30)
+
+    @mock.patch("jommerce.auth.throttling.time.time", return_value=1000)
+    def test_concurrent_requests(self, time):
+        self.assertEqual(self.bucket.consume("key"), 0)
+        add = cache.add
+
+        def add_during_another_request(*args, **kwargs):
+            cache.add = add
+            # Takes the last token before this request updates the bucket.
+            self.assertEqual(self.bucket.consume("key"), 0)
+            return add(*args, **kwargs)
+
+        with mock.patch.object(cache, "add", add_during_another_request):
+            self.assertEqual(self.bucket.consume("key"), 30)
+
+    async def test_aconsume(self):
+        self.assertEqual(await self.bucket.aconsume("key"), 0)
+        self.assertEqual(await self.bucket.aconsume("key"), 0)
+        self.assertGreater(await self.bucket.aconsume("key"), 0)
+
+
+@override_settings(
+    AUTH_THROTTLE_RATES={"login_ip": "2/minute", "login_email": "1/minute"}
+)
+class ThrottleTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def request(self, ip):
+        return RequestFactory().post("/login/", REMOTE_ADDR=ip)
+
+    def test_throttle_by_ip(self):
+        self.assertEqual(throttle("login", self.request("1.1.1.1")), 0)
+        self.assertEqual(throttle("login", self.request("1.1.1.1")), 0)
+        self.assertGreater(throttle("login", self.request("1.1.1.1")), 0)
+        self.assertEqual(throttle("login", self.request("2.2.2.2")), 0)
+
+    def test_throttle_by_email(self):
+        self.assertEqual(throttle("login", self.request("1.1.1.1"), "a@example.com"), 0)
+        self.assertGreater(
+            throttle("login", self.request("2.2.2.2"), " A@example.com"), 0
+        )
+        self.assertEqual(throttle("login", self.request("3.3.3.3"), "b@example.com"), 0)
+
+    def test_other_views_are_not_throttled(self):
+        for _ in range(5):
+            self.assertEqual(throttle("signup", self.request("1.1.1.1")), 0)
+
+
+@override_settings(
+    ROOT_URLCONF="jommerce.auth.urls",
+    AUTH_THROTTLE_RATES={"login_ip": "1/minute", "signup_ip": "1/minute"},
+)
+class ThrottledViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_reject_login_before_hashing(self):
+        data = {"email": "test@example.com", "password": "123456"}
+        self.client.post("/login/", data=data)
+        with mock.patch.object(User, "averify_password") as averify_password:
+            response = self.client.post("/login/", data=data)
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response["Retry-After"], "60")
+        averify_password.assert_not_called()
+
+    def test_reject_signup(self):
+        self.client.post("/signup/", data={"email": "a@example.com", "password": "1"})
+        response = self.client.post(
+            "/signup/", data={"email": "b@example.com", "password": "1"}
+        )
+        self.assertEqual(response.status_code, 429)
+        self.assertFalse(User.objects.filter(email="b@example.com").exists())
@@ -18,3 +18,9 @@ class UrlPatternsTests(TestCase):
 
     def test_reverse_signup_name(self):
         self.assertReverse("/signup/", "signup")
+
+    def test_reverse_api_names(self):
+        self.assertReverse("/api/login/", "api_login")
+        self.assertReverse("/api/logout/", "api_logout")
+        self.assertReverse("/api/signup/", "api_signup")
+        self.assertReverse("/api/me/", "api_me")
@@ -1,6 +1,11 @@
 import string
-from django.test import TestCase
-from jommerce.auth.utils import generate_random_string
+from unittest import mock
+from django.test import TestCase, SimpleTestCase
+from jommerce.auth.utils import (
+    generate_random_string,
+    RandomBuffer,
+    RandomStringGenerator,
+)
 
 
 class GenerateRandomStringTests(TestCase):
@@ -87,3 +92,61 @@ class GenerateRandomStringTests(TestCase):
             generate_random_string(
                 lowercase=False, uppercase=False, digit=False, symbol=False
             )
+
+
+class RandomBufferTests(SimpleTestCase):
+    @mock.patch("jommerce.auth.utils.secrets.token_bytes", wraps=bytes)
+    def test_read_from_a_single_block(self, token_bytes):
+        buffer = RandomBuffer(size=8)
+        self.assertEqual(len(buffer.read(3)), 3)
+        self.assertEqual(len(buffer.read(5)), 5)
+        token_bytes.assert_called_once_with(8)
+        self.assertEqual(len(buffer.read(20)), 20)
+        token_bytes.assert_called_with(20)
+
+    def test_discard_the_parent_bytes_after_a_fork(self):
+        buffer = RandomBuffer(size=64)
+        with mock.patch("jommerce.auth.utils.os.getpid", return_value=1):
+            buffer.read(1)
+            in_parent = buffer.read(8)
+        buffer = RandomBuffer(size=64)
+        with mock.patch("jommerce.auth.utils.os.getpid", return_value=1):
+            buffer.read(1)
+        with mock.patch("jommerce.auth.utils.os.getpid", return_value=2):
+            self.assertNotEqual(buffer.read(8), in_parent)
+
+    def test_randbelow(self):
+        buffer = RandomBuffer()
+        values = {buffer.randbelow(5) for _ in range(500)}
+        self.assertEqual(values, {0, 1, 2, 3, 4})
+
+    def test_sample(self):
+        buffer = RandomBuffer()
+        sample = buffer.sample(10, 4)
+        self.assertEqual(len(set(sample)), 4)
+        self.assertTrue(all(0 <= i < 10 for i in sample))
+        self.assertEqual(sorted(buffer.sample(5, 5)), [0, 1, 2, 3, 4])
+
+
+class RandomStringGeneratorTests(SimpleTestCase):
+    def test_reject_biased_bytes(self):
+        buffer = mock.Mock(read=mock.Mock(side_effect=[bytes([255, 0, 13]), b"\x09"]))
+        generator = RandomStringGenerator(string.digits, buffer=buffer)
+        # 250 is the largest multiple of 10 below 256, so 255 is dropped.
+        self.assertEqual(generator.generate(3), "039")
+
+    def test_generate_from_the_alphabet(self):
+        generator = RandomStringGenerator("abc")
+        s = generator.generate(300)
+        self.assertEqual(len(s), 300)
+        self.assertEqual(set(s), {"a", "b", "c"})
+
+    def test_generate_many(self):
+        tokens = RandomStringGenerator(string.ascii_letters).generate_many(100, 16)
+        self.assertEqual(len(tokens), 100)
+        self.assertTrue(all(len(token) == 16 for token in tokens))
+        self.assertEqual(len(set(tokens)), 100)
+
+    def test_invalid_alphabet(self):
+        with self.assertRaises(ValueError):
+            RandomStringGenerator("")
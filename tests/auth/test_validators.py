@@ -1,7 +1,16 @@
-from django.test import TestCase
-from django.core.exceptions import ValidationError
+import os
+import time
+import tempfile
+from io import StringIO
+from django.test import TestCase, SimpleTestCase, override_settings
+from django.core.exceptions import ImproperlyConfigured, ValidationError
+from django.core.management import call_command
 from jommerce.auth.validators import (
     get_password_validators,
+    get_password_policy,
+    validate_password,
+    PasswordPolicy,
+    BreachedPasswordValidator,
     get_username_validators,
     UsernameLengthValidator,
     PasswordLengthValidator,
@@ -81,6 +90,94 @@ class PasswordValidatorsTest(TestCase):
         self.assertIsNone(validate("s5FD#fs!4$3"))
 
 
+class PasswordPolicyTests(TestCase):
+    def setUp(self):
+        self.policy = PasswordPolicy(
+            [
+                password_validators.length,
+                password_validators.number,
+                password_validators.lowercase,
+                password_validators.uppercase,
+                password_validators.symbol,
+                validate_return_none,
+            ]
+        )
+
+    def test_report_all_errors(self):
+        errors = self.policy.get_errors("ABC")
+        self.assertEqual(
+            [error.code for error in errors],
+            [
+                "password_too_short",
+                "password_no_number",
+                "password_no_lowercase",
+                "password_no_symbol",
+            ],
+        )
+        with self.assertRaises(ValidationError) as context:
+            self.policy("ABC")
+        self.assertEqual(len(context.exception.error_list), 4)
+
+    def test_valid_password(self):
+        self.assertEqual(self.policy.get_errors("s%dFg$2lsf0@"), [])
+        self.assertIsNone(self.policy("s%dFg$2lsf0@"))
+
+    def test_run_other_validators(self):
+        policy = PasswordPolicy([password_validators.number, validate_raise_error])
+        self.assertEqual(
+            [error.messages for error in policy.get_errors("abc")],
+            [["at least one number"], ["fake message"]],
+        )
+
+    def test_rebuild_when_the_setting_changes(self):
+        with self.settings(
+            AUTH_PASSWORD_VALIDATORS=["jommerce.auth.validators.password.number"]
+        ):
+            self.assertIs(get_password_policy(), get_password_policy())
+            with self.assertRaisesMessage(ValidationError, "at least one number"):
+                validate_password("abc")
+        self.assertIsNone(validate_password("abc"))
+
+
+class BreachedPasswordValidatorTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        directory = tempfile.TemporaryDirectory()
+        cls.addClassCleanup(directory.cleanup)
+        passwords = os.path.join(directory.name, "passwords.txt")
+        with open(passwords, "w") as file:
+            file.write("\n".join(f"password{i}" for i in range(1000)))
+        cls.path = os.path.join(directory.name, "breached.bin")
+        call_command("buildbreachedpasswords", passwords, cls.path, stdout=StringIO())
+
+    def test_reject_breached_passwords(self):
+        validate = BreachedPasswordValidator(self.path)
+        for password in ("password0", "password500", "password999"):
+            with self.assertRaisesMessage(
+                ValidationError, "This password has appeared in a data breach."
+            ):
+                validate(password)
+        self.assertIsNone(validate("password1000"))
+        self.assertIsNone(validate(""))
+
+    def test_lookup_is_fast(self):
+        validator = BreachedPasswordValidator(self.path)
+        validator.open()
+        start = time.perf_counter()
+        for i in range(1000):
+            validator.is_breached(f"s%dFg$2lsf{i}")
+        self.assertLess((time.perf_counter() - start) / 1000, 0.001)
+
+    def test_use_the_setting(self):
+        with override_settings(AUTH_BREACHED_PASSWORDS_PATH=self.path):
+            self.assertIs(BreachedPasswordValidator().is_breached("password1"), True)
+        with self.assertRaisesMessage(
+            ImproperlyConfigured, "Set AUTH_BREACHED_PASSWORDS_PATH"
+        ):
+            BreachedPasswordValidator()("password1")
+
+
 class UsernameValidatorsTest(TestCase):
     def test_get_username_validators(self):
         with self.settings(
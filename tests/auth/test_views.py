@@ -1,4 +1,6 @@
+from unittest import mock
 from django.test import TestCase, override_settings
+from jommerce.auth.hashers import HasherOverloaded
 from jommerce.auth.models import User, AnonymousUser, Session
 from jommerce.auth import forms
 
@@ -39,6 +41,19 @@ class LoginViewTests(TestCase):
         session = Session.objects.get(pk=response.cookies["session_id"].value)
         self.assertEqual(session.user, self.user)
 
+    @override_settings(AUTH_SESSION_COOKIE_NAME="session_id")
+    @override_settings(MIDDLEWARE=["jommerce.auth.middleware.AuthenticationMiddleware"])
+    def test_login_with_a_new_session_id(self):
+        Session.objects.create(id="anonymous_session", data={"cart": [1]})
+        self.client.cookies["session_id"] = "anonymous_session"
+        response = self.client.post(
+            "/login/", data={"email": "test@example.com", "password": "123456"}
+        )
+        session = Session.objects.get(pk=response.cookies["session_id"].value)
+        self.assertEqual(session.user, self.user)
+        self.assertEqual(session["cart"], [1])
+        self.assertFalse(Session.objects.filter(pk="anonymous_session").exists())
+
     @override_settings(AUTH_LOGIN_REDIRECT_URL="/custom/")
     @override_settings(MIDDLEWARE=["tests.auth.test_views.AnonymousUserMiddleware"])
     def test_redirect_after_login(self):
@@ -75,6 +90,15 @@ class LoginViewTests(TestCase):
         )
         self.assertFormError(response, "form", "password", ["Incorrect password"])
 
+    @override_settings(AUTH_PASSWORD_HASHER_QUEUE_TIMEOUT=2.5)
+    def test_login_when_hashers_are_overloaded(self):
+        with mock.patch.object(User, "averify_password", side_effect=HasherOverloaded):
+            response = self.client.post(
+                "/login/", data={"email": "test@example.com", "password": "123456"}
+            )
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response["Retry-After"], "3")
+
 
 @override_settings(ROOT_URLCONF="jommerce.auth.urls")
 class LogoutViewTests(TestCase):